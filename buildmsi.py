@@ -62,7 +62,6 @@ SOURCE_PACKAGES = [
     SourceDep("itsdangerous"),
     SourceDep("requests"),
     SourceDep("waitress"),
-    SourceDep("zipstream"),
     SourceDep("roman"),
     SourceDep("Wand", "wand"),
     SourceDep("isbnlib"),
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2014 Johannes Baiter <johannes.baiter@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Persistent catalog of the workflows in a project directory.
+"""
+
+from __future__ import division, unicode_literals
+
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+from datetime import datetime
+
+from spreads.vendor.pathlib import Path
+
+from spreads.workflow import Workflow, WorkflowSummary
+
+logger = logging.getLogger('spreads.catalog')
+
+
+class WorkflowCatalog(object):
+    """ SQLite-backed catalog that maps workflow ids and slugs to their
+    directories and summaries.
+
+    The catalog survives restarts, so workflows don't have to be rescanned
+    on every start. Changes are detected without reading any of the bags:
+
+    - When the modification time of the project directory has changed,
+      workflows were added, removed or renamed and the directory listing is
+      compared against the catalog.
+    - Every entry stores the modification times of the files the summary is
+      read from (the tag manifest, ``dcmeta.txt`` and the page journal), so
+      an outdated entry is detected with a few :py:func:`os.stat` calls.
+      Entries are checked when they are looked up and when reloading.
+    - A workflow's slug can change without the project directory being
+      modified, so a slug that is not found makes all entries be checked,
+      at most once every :py:attr:`FORCED_REFRESH_INTERVAL` seconds.
+
+    :attr location:     Directory the workflows are stored in
+    :type location:     :py:class:`pathlib.Path`
+    :attr db_path:      Path to the SQLite database
+    :type db_path:      :py:class:`pathlib.Path`
+    """
+    #: Files whose modification times decide if a catalog entry is
+    #: outdated, in addition to the bag's tag manifests
+    FINGERPRINT_FILES = ('dcmeta.txt', 'pagemeta.journal')
+    #: Minimum number of seconds between checking all entries because a
+    #: slug was not found, so lookups of unknown slugs stay cheap
+    FORCED_REFRESH_INTERVAL = 10
+
+    def __init__(self, location, db_path):
+        """ Open (and if neccessary, create) the catalog.
+
+        :param location:    Directory the workflows are stored in
+        :type location:     unicode or :py:class:`pathlib.Path`
+        :param db_path:     Path to the SQLite database
+        :type db_path:      unicode or :py:class:`pathlib.Path`
+        """
+        if not isinstance(location, Path):
+            location = Path(location)
+        if not isinstance(db_path, Path):
+            db_path = Path(db_path)
+        self.location = location
+        self.db_path = db_path
+        #: Lock that is held while the catalog is refreshed, to avoid
+        #: multiple threads scanning the project directory at once
+        self._lock = threading.Lock()
+        #: When all entries were last checked because of a missing slug
+        self._last_forced_refresh = None
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS workflows (
+                    path TEXT PRIMARY KEY,
+                    location TEXT NOT NULL,
+                    id TEXT NOT NULL,
+                    slug TEXT,
+                    title TEXT,
+                    page_count INTEGER NOT NULL,
+                    last_modified REAL NOT NULL,
+                    fingerprint TEXT NOT NULL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS workflows_id "
+                         "ON workflows (location, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS workflows_slug "
+                         "ON workflows (location, slug)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS locations (
+                    path TEXT PRIMARY KEY,
+                    mtime REAL NOT NULL)""")
+
+    @contextmanager
+    def _connect(self):
+        """ Open a connection for a single operation, that commits on
+        success, rolls back on errors and is closed afterwards.
+        """
+        # Connections are cheap to open for SQLite, so we use one per
+        # operation to stay safe across threads
+        with closing(sqlite3.connect(unicode(self.db_path),
+                                     timeout=60)) as conn:
+            with conn:
+                yield conn
+
+    @classmethod
+    def _get_fingerprint(cls, path):
+        """ Get the modification times of the files a summary is read from.
+
+        :param path:    Workflow directory
+        :type path:     :py:class:`pathlib.Path`
+        :rtype:         unicode
+        """
+        mtimes = []
+        # The tag manifests depend on the configured checksum algorithms
+        fpaths = (sorted(path.glob('tagmanifest-*.txt')) +
+                  [path/fname for fname in cls.FINGERPRINT_FILES])
+        for fpath in fpaths:
+            try:
+                mtimes.append(repr(fpath.stat().st_mtime))
+            except OSError:
+                mtimes.append('-')
+        return ":".join(mtimes)
+
+    def _to_summary(self, row):
+        path, id, slug, title, page_count, last_modified = row
+        return WorkflowSummary(
+            path=Path(path), id=id, slug=slug, title=title,
+            page_count=page_count,
+            last_modified=datetime.fromtimestamp(last_modified))
+
+    def _store(self, conn, path, fingerprint):
+        """ Read the summary for a workflow and store it in the catalog.
+
+        :returns:   The summary or None if the directory no longer contains
+                    a workflow
+        :rtype:     :py:class:`spreads.workflow.WorkflowSummary`
+        """
+        if not Workflow.is_workflow_dir(path):
+            conn.execute("DELETE FROM workflows WHERE path = ?",
+                         (unicode(path),))
+            return None
+        summary = WorkflowSummary.from_path(path)
+        if summary is None:
+            # Directories from older versions have to be converted first
+            summary = WorkflowSummary.from_workflow(Workflow.load(path))
+            fingerprint = self._get_fingerprint(path)
+        logger.debug("Updating catalog entry for {0}".format(path))
+        conn.execute(
+            "INSERT OR REPLACE INTO workflows VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (unicode(path), unicode(self.location), summary.id, summary.slug,
+             summary.title, summary.page_count,
+             (time.mktime(summary.last_modified.timetuple())
+              + summary.last_modified.microsecond/1000000),
+             fingerprint))
+        return summary
+
+    def _check_entry(self, conn, path, fingerprint):
+        """ Update a single entry if the files it was read from changed. """
+        current = self._get_fingerprint(path)
+        if current != fingerprint:
+            self._store(conn, path, current)
+
+    def refresh(self, force=False):
+        """ Bring the catalog up to date with the project directory.
+
+        :param force:   Check all entries for changes, even if the project
+                        directory itself was not modified
+        :type force:    bool
+        """
+        with self._lock, self._connect() as conn:
+            location = unicode(self.location)
+            dir_mtime = self.location.stat().st_mtime
+            row = conn.execute("SELECT mtime FROM locations WHERE path = ?",
+                               (location,)).fetchone()
+            known = dict(conn.execute(
+                "SELECT path, fingerprint FROM workflows WHERE location = ?",
+                (location,)))
+            if row is not None and row[0] == dir_mtime:
+                if force:
+                    for path, fingerprint in known.iteritems():
+                        self._check_entry(conn, Path(path), fingerprint)
+                return
+            logger.debug("Project directory {0} was modified, updating "
+                         "workflow catalog".format(location))
+            found = set()
+            for candidate in self.location.iterdir():
+                path = unicode(candidate)
+                if path in known:
+                    found.add(path)
+                    if force:
+                        self._check_entry(conn, candidate, known[path])
+                elif Workflow.is_workflow_dir(candidate):
+                    found.add(path)
+                    self._store(conn, candidate,
+                                self._get_fingerprint(candidate))
+            for path in set(known) - found:
+                conn.execute("DELETE FROM workflows WHERE path = ?", (path,))
+            conn.execute("INSERT OR REPLACE INTO locations VALUES (?, ?)",
+                         (location, dir_mtime))
+
+    def _may_force_refresh(self):
+        """ Check if enough time passed since all entries were last checked
+        because of a missing slug, and if so, restart the interval.
+        """
+        now = time.time()
+        with self._lock:
+            if (self._last_forced_refresh is not None and
+                    now - self._last_forced_refresh <
+                    self.FORCED_REFRESH_INTERVAL):
+                return False
+            self._last_forced_refresh = now
+            return True
+
+    def summaries(self, reload=False):
+        """ Get summaries for all workflows in the catalog.
+
+        Only changes to the project directory are picked up, entries that
+        were not looked up with :py:meth:`find` since their workflow was
+        modified are only brought up to date when reloading.
+
+        :param reload:  Re-read all summaries from disk
+        :type reload:   bool
+        :rtype:         list of :py:class:`spreads.workflow.WorkflowSummary`
+        """
+        location = unicode(self.location)
+        if reload:
+            with self._lock, self._connect() as conn:
+                conn.execute("DELETE FROM workflows WHERE location = ?",
+                             (location,))
+                conn.execute("DELETE FROM locations WHERE path = ?",
+                             (location,))
+        self.refresh(force=reload)
+        with self._connect() as conn:
+            return [self._to_summary(row) for row in conn.execute(
+                "SELECT path, id, slug, title, page_count, last_modified "
+                "FROM workflows WHERE location = ?", (location,))]
+
+    def find(self, key, value):
+        """ Look up a single workflow summary.
+
+        :param key:     Attribute to look the workflow up by
+        :type key:      unicode, one of 'id' or 'slug'
+        :param value:   Value of the attribute
+        :type value:    unicode
+        :rtype:         :py:class:`spreads.workflow.WorkflowSummary` or None
+        """
+        if key not in ('slug', 'id'):
+            raise ValueError("'key' must be one of ('id', 'slug')")
+        query = ("SELECT path, fingerprint FROM workflows "
+                 "WHERE location = ? AND {0} = ?".format(key))
+        self.refresh()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(query, (unicode(self.location), value))\
+                      .fetchone()
+            if row is not None:
+                self._check_entry(conn, Path(row[0]), row[1])
+        if row is None and key == 'slug' and self._may_force_refresh():
+            # The slug might have changed without the project directory
+            # being modified, so we check all entries before giving up
+            self.refresh(force=True)
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT path, id, slug, title, page_count, last_modified "
+                "FROM workflows WHERE location = ? AND {0} = ?".format(key),
+                (unicode(self.location), value)).fetchone()
+        if row is None:
+            return None
+        return self._to_summary(row)
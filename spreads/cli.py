@@ -342,6 +342,11 @@ def _update_callback(_, changes):
         draw_progress(changes['status']['step_progress'])
 
 
+def _should_force(config):
+    """ Check if the user requested to ignore up-to-date results. """
+    return 'force' in config.keys() and config['force'].get(bool)
+
+
 def postprocess(config):
     """ Launch postprocessing plugins and display their progress
 
@@ -353,7 +358,7 @@ def postprocess(config):
     draw_progress(0.0)
     spreads.workflow.on_modified.connect(_update_callback, sender=workflow,
                                          weak=False)
-    workflow.process()
+    workflow.process(force=_should_force(config))
 
 
 def output(config):
@@ -367,7 +372,7 @@ def output(config):
     draw_progress(0)
     spreads.workflow.on_modified.connect(_update_callback, sender=workflow,
                                          weak=False)
-    workflow.output()
+    workflow.output(force=_should_force(config))
 
 
 def wizard(config):
@@ -80,6 +80,10 @@ CORE_OPTIONS = {
     'capture_keys': OptionTemplate(value=[" ", "b"],
                                    docstring="Keys to trigger capture",
                                    selectable=False),
+    'checksum_algorithms': OptionTemplate(
+        value=["md5"],
+        docstring="Checksum algorithms for the manifests of new workflows",
+        selectable=False, advanced=True),
 }
 
 
@@ -202,6 +202,9 @@ def setup_parser(config):
     postprocess_parser.add_argument(
         "--jobs", "-j", dest="jobs", type=int, default=None,
         metavar="<int>", help="Number of concurrent processes")
+    postprocess_parser.add_argument(
+        "--force", "-f", dest="force", action="store_true", default=None,
+        help="Process all pages, even if they are up to date")
     postprocess_parser.set_defaults(subcommand=cli.postprocess)
     _add_arguments(parsers=(postprocess_parser, wizard_parser),
                    mixins=(plugin.ProcessHooksMixin,))
@@ -211,6 +214,9 @@ def setup_parser(config):
         help="Generate output files.")
     output_parser.add_argument(
         "path", type=unicode, help="Project path")
+    output_parser.add_argument(
+        "--force", "-f", dest="force", action="store_true", default=None,
+        help="Generate all output files, even if they are up to date")
     output_parser.set_defaults(subcommand=cli.output)
     _add_arguments(parsers=(output_parser, wizard_parser),
                    mixins=(plugin.OutputHooksMixin,))
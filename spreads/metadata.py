@@ -152,6 +152,12 @@ class Metadata(MutableMapping):
         self.filepath = base_path/self.FILENAME
         self._backingstore = BagInfo(unicode(self.filepath))
 
+    def batch(self):
+        """ Context manager that buffers all changes and writes them to
+        `dcmeta.txt` only once, when it is left.
+        """
+        return self._backingstore.batch()
+
     def __getitem__(self, key):
         val = self._backingstore[key]
         schemafield = self._schemafield_for_key(key)
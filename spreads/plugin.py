@@ -23,7 +23,12 @@ functions for enumerating and loading plugins.
 from __future__ import division, unicode_literals
 
 import abc
+import copy
+import hashlib
+import json
 import logging
+import threading
+import weakref
 from collections import OrderedDict
 
 import pkg_resources
@@ -31,8 +36,8 @@ from blinker import Namespace
 from enum import Enum
 
 from spreads.config import OptionTemplate
-from spreads.util import (abstractclassmethod, DeviceException,
-                          MissingDependencyException)
+from spreads.util import (abstractclassmethod, CustomJSONEncoder,
+                          DeviceException, MissingDependencyException)
 
 
 logger = logging.getLogger("spreads.plugin")
@@ -41,6 +46,11 @@ logger = logging.getLogger("spreads.plugin")
 devices = None
 extensions = dict()
 
+#: Plugin instances that are currently in use by at least one workflow, keyed
+#: by plugin name and configuration fingerprint
+instances = weakref.WeakValueDictionary()
+_instances_lock = threading.Lock()
+
 
 class ExtensionException(Exception):
     """" Raised when something went wrong during plugin enumeration/ or
@@ -121,6 +131,10 @@ class DeviceFeatures(Enum):  # pragma: no cover
     #: Device can read set its own focus distance and read out its autofocus
     CAN_ADJUST_FOCUS = 4
 
+    #: Device can write captured images to a file-like object, see
+    #: :py:meth:`DeviceDriver.capture_to_stream`
+    CAN_CAPTURE_TO_STREAM = 5
+
 
 class DeviceDriver(SpreadsPlugin):  # pragma: no cover
     """ Base class for device drivers.
@@ -222,6 +236,20 @@ class DeviceDriver(SpreadsPlugin):  # pragma: no cover
         """
         raise NotImplementedError
 
+    def capture_to_stream(self, fp):
+        """ Capture a single image with the device and write it to a
+        file-like object.
+
+        Only called for devices with the
+        :py:attr:`DeviceFeatures.CAN_CAPTURE_TO_STREAM` feature, instead of
+        :py:meth:`capture`. This allows the image to be hashed while it is
+        written, instead of reading it back from disk afterwards.
+
+        :param fp:      Writable file-like object for the image data
+        :type fp:       file-like object
+        """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def finish_capture(self):
         """ Tell device to finish capturing.
@@ -353,6 +381,34 @@ class ProcessHooksMixin(object):
         """
         pass
 
+    def process_page(self, page, target_path):
+        """ Perform the postprocessing for a single page.
+
+        This method is optional. Plugins that implement it don't need to see
+        all pages at once, so pages can be streamed through them while
+        previous and subsequent plugins are working on other pages. Plugins
+        that don't implement it act as a barrier, i.e. :py:meth:`process` is
+        only called once all previous plugins are done with all pages.
+
+        Will be called concurrently from multiple threads, but never
+        concurrently for the same page.
+
+        :param page:        Page to be processed
+        :type page:         :py:class:`spreads.workflow.Page`
+        :param target_path: Target directory for processed files
+        :type target_path:  :py:class:`pathlib.Path`
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def supports_page_processing(cls):
+        """ Check if the plugin implements :py:meth:`process_page`.
+
+        :rtype: bool
+        """
+        return (cls.process_page.__func__ is not
+                ProcessHooksMixin.process_page.__func__)
+
 
 class OutputHooksMixin(object):
     """ Mixin for plugins that want to create output files. """
@@ -426,6 +482,59 @@ def get_plugins(*names):
     return plugins
 
 
+def get_config_fingerprint(plugin_cls, config):
+    """ Get a fingerprint of the configuration values a plugin can see.
+
+    :param plugin_cls:  Plugin class
+    :type plugin_cls:   :py:class:`SpreadsPlugin` class
+    :param config:      Global configuration
+    :type config:       :py:class:`spreads.config.Configuration`
+    :returns:           MD5 hexdigest of the relevant configuration values
+    :rtype:             unicode
+    """
+    # NOTE: `plugin_cls.__name__` would return the name of the class, the
+    #       section name is only visible on instances, so we have to look it
+    #       up in the class dictionaries
+    section = next((klass.__dict__['__name__']
+                    for klass in plugin_cls.__mro__
+                    if '__name__' in klass.__dict__), None)
+    if section is not None:
+        values = config[section].flatten()
+    else:
+        values = config.flatten()
+    return hashlib.md5(json.dumps(values, sort_keys=True,
+                                  cls=CustomJSONEncoder)).hexdigest()
+
+
+def get_plugin_instance(name, plugin_cls, config):
+    """ Get a configured plugin instance, shared with other workflows that
+    use the same configuration for the plugin.
+
+    Instances are kept around for as long as at least one workflow holds a
+    reference to them, so that loading many workflows with the same
+    configuration does not repeat the (sometimes expensive) plugin
+    initialization.
+
+    :param name:        Name of the plugin
+    :type name:         unicode
+    :param plugin_cls:  Plugin class
+    :type plugin_cls:   :py:class:`SpreadsPlugin` class
+    :param config:      Global configuration
+    :type config:       :py:class:`spreads.config.Configuration`
+    :rtype:             :py:class:`SpreadsPlugin`
+    """
+    key = (name, get_config_fingerprint(plugin_cls, config))
+    with _instances_lock:
+        instance = instances.get(key)
+        if instance is None:
+            logger.debug("Instantiating plugin \"{0}\"".format(name))
+            # The instance must not follow later changes to the
+            # configuration it was created from, since it is shared
+            instance = plugin_cls(copy.deepcopy(config))
+            instances[key] = instance
+        return instance
+
+
 def available_drivers():
     """ Get the names of all installed device drivers.
 
@@ -22,18 +22,23 @@ Various utility functions and classes.
 from __future__ import division, unicode_literals, print_function
 
 import abc
+import atexit
 import glob
 import json
 import logging
+import multiprocessing
 import os
 import pkg_resources
 import platform
 import re
 import subprocess
+import threading
+from collections import deque
 from unicodedata import normalize
 
 import blinker
 import colorama
+import concurrent.futures as concfut
 import psutil
 import roman
 from colorama import Fore, Back, Style
@@ -120,6 +125,158 @@ def check_futures_exceptions(futures):
         raise exc
 
 
+class ExecutorService(object):
+    """ Process-wide pool of executors, divided into named lanes.
+
+    Every lane is backed by a single executor with a fixed number of workers
+    that is created on first use and shared by all callers, so the total
+    concurrency stays bounded no matter how many workflows are active.
+
+    :attr lanes:    Mapping of lane names to a tuple of the executor type
+                    (``'thread'`` or ``'process'``) and the maximum number of
+                    workers
+    :type lanes:    dict
+    """
+    def __init__(self, lanes):
+        self.lanes = lanes
+        self._executors = {}
+        self._lock = threading.Lock()
+
+    def get_executor(self, lane):
+        """ Get the executor for a lane.
+
+        :param lane:    Name of the lane
+        :type lane:     unicode
+        :rtype:         :py:class:`concurrent.futures.Executor`
+        """
+        with self._lock:
+            if lane not in self._executors:
+                kind, max_workers = self.lanes[lane]
+                if kind == 'process':
+                    executor = concfut.ProcessPoolExecutor(max_workers)
+                else:
+                    executor = concfut.ThreadPoolExecutor(max_workers)
+                self._executors[lane] = executor
+            return self._executors[lane]
+
+    def submit(self, lane, func, *args, **kwargs):
+        """ Schedule a function for execution on a lane.
+
+        :param lane:    Name of the lane
+        :type lane:     unicode
+        :param func:    Function to execute, must be picklable for
+                        process lanes
+        :returns:       Future for the function's result
+        :rtype:         :py:class:`concurrent.futures.Future`
+        """
+        return self.get_executor(lane).submit(func, *args, **kwargs)
+
+    def shutdown(self, wait=True):
+        """ Shut down all executors.
+
+        They will be re-created if another task is submitted afterwards.
+
+        :param wait:    Wait for all pending tasks to finish
+        :type wait:     bool
+        """
+        with self._lock:
+            executors = self._executors.values()
+            self._executors = {}
+        for executor in executors:
+            executor.shutdown(wait=wait)
+
+
+class LaneExecutor(object):
+    """ Executes tasks on a lane of an :py:class:`ExecutorService`, for code
+    that expects a plain executor.
+    """
+    def __init__(self, service, lane):
+        """ Create the executor.
+
+        :param service: Service to run the tasks on
+        :type service:  :py:class:`ExecutorService`
+        :param lane:    Name of the lane
+        :type lane:     unicode
+        """
+        self._service = service
+        self._lane = lane
+
+    def submit(self, func, *args, **kwargs):
+        """ Schedule a function for execution on the lane.
+
+        :param func:    Function to execute
+        :returns:       Future for the function's result
+        :rtype:         :py:class:`concurrent.futures.Future`
+        """
+        return self._service.submit(self._lane, func, *args, **kwargs)
+
+
+class SerialExecutor(object):
+    """ Executes tasks on a lane of an :py:class:`ExecutorService` one after
+    another, in the order they were submitted.
+
+    Useful for tasks that operate on the same resources, without
+    dedicating a thread to them.
+    """
+    def __init__(self, service, lane):
+        """ Create the executor.
+
+        :param service: Service to run the tasks on
+        :type service:  :py:class:`ExecutorService`
+        :param lane:    Name of the lane, must be a thread lane
+        :type lane:     unicode
+        """
+        self._service = service
+        self._lane = lane
+        self._queue = deque()
+        self._running = False
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        """ Schedule a function for execution after all previously submitted
+        functions.
+
+        :param func:    Function to execute
+        :returns:       Future for the function's result
+        :rtype:         :py:class:`concurrent.futures.Future`
+        """
+        future = concfut.Future()
+        with self._lock:
+            self._queue.append((future, func, args, kwargs))
+            if not self._running:
+                self._running = True
+                self._service.submit(self._lane, self._run_next)
+        return future
+
+    def _run_next(self):
+        with self._lock:
+            future, func, args, kwargs = self._queue.popleft()
+        if future.set_running_or_notify_cancel():
+            try:
+                future.set_result(func(*args, **kwargs))
+            except BaseException as exc:
+                future.set_exception(exc)
+        with self._lock:
+            # Re-submit instead of looping, so we don't hog a worker while
+            # other callers are waiting for the lane
+            if self._queue:
+                self._service.submit(self._lane, self._run_next)
+            else:
+                self._running = False
+
+
+#: Shared executors for the whole process, divided into lanes for device
+#: communication, checksumming, blocking file I/O and CPU-heavy image
+#: processing
+executors = ExecutorService({
+    'device': ('thread', 8),
+    'hashing': ('thread', 2),
+    'io': ('thread', 4),
+    'image': ('process', multiprocessing.cpu_count()),
+})
+atexit.register(executors.shutdown)
+
+
 def get_free_space(path):
     """ Return free space on file-system underlying the passed path.
 
@@ -148,6 +305,55 @@ def get_subprocess(cmdline, **kwargs):
     return subprocess.Popen(cmdline, **kwargs)
 
 
+#: Lock that is held while the capability probe cache is updated
+_probe_lock = threading.Lock()
+
+
+def get_cached_probe(executable, name, probe_func):
+    """ Run a capability probe for an executable, caching the result on disk.
+
+    Probes usually spawn the executable (e.g. to parse its help text), which
+    is too expensive to do every time a plugin is instantiated. The results
+    are stored in ``probes.json`` in the user's data directory and are
+    invalidated once the executable's modification time changes.
+
+    :param executable:  Path to the executable that is probed
+    :type executable:   unicode
+    :param name:        Name of the probe, must be unique for the executable
+    :type name:         unicode
+    :param probe_func:  Function that performs the probe. Will be called with
+                        the path to the executable and has to return a
+                        JSON-serializable value
+    :type probe_func:   callable
+    :returns:           Result of the probe
+    """
+    try:
+        mtime = os.stat(os.path.realpath(executable)).st_mtime
+    except OSError:
+        # Can't tell if the executable changed, so don't use the cache
+        return probe_func(executable)
+    cache_path = os.path.join(get_data_dir(create=True), 'probes.json')
+    key = "{0}:{1}".format(os.path.realpath(executable), name)
+    with _probe_lock:
+        try:
+            with open(cache_path, 'rb') as fp:
+                cache = json.load(fp)
+        except (IOError, ValueError):
+            cache = {}
+        if key in cache and cache[key]['mtime'] == mtime:
+            return cache[key]['result']
+        result = probe_func(executable)
+        cache[key] = {'mtime': mtime, 'result': result}
+        try:
+            with open(cache_path, 'wb') as fp:
+                json.dump(cache, fp)
+        except IOError:
+            logging.getLogger('spreads.util').warning(
+                "Could not write capability probe cache to {0}"
+                .format(cache_path))
+        return result
+
+
 def wildcardify(pathnames):
     """ Try to generate a single path with wildcards that matches all
         `pathnames`.
@@ -23,11 +23,19 @@ entities.
 from __future__ import division, unicode_literals
 
 import copy
+import hashlib
 import logging
+import multiprocessing
+import os
+import Queue
 import shutil
+import tempfile
 import threading
+import time
 import uuid
+from collections import OrderedDict
 from datetime import datetime
+from stat import S_ISREG
 
 import concurrent.futures as concfut
 import spreads.vendor.bagit as bagit
@@ -48,6 +56,8 @@ except ImportError:
     HAS_JPEGTRAN = False
     from PIL import Image
 
+logger = logging.getLogger('spreads.workflow')
+
 signals = Namespace()
 on_created = signals.signal('workflow:created', doc="""\
 Sent by a :class:`Workflow` when a new workflow was created.
@@ -62,6 +72,31 @@ Sent by a :class:`Workflow` when it was modified.
 :keyword  dict changes          the modified attributes
 """)
 
+on_changed = signals.signal('workflow:changed', doc="""\
+Sent by a :class:`Workflow` when pages were added, removed or updated or its
+table of contents changed.
+
+Only the changes are included, so the size of the event does not grow with the
+size of the workflow. If too many pages changed at once, the pages are left out
+and receivers are asked to re-read all pages instead.
+
+:argument :class:`Workflow`:            the workflow that was changed
+:keyword unicode epoch:                 identifies the workflow instance that
+                                        sent the event, versions can only be
+                                        compared within the same epoch
+:keyword int version:                   the new version of the workflow's
+                                        pages and table of contents, increases
+                                        by one with every event
+:keyword list<Page> pages_added:        pages that were added
+:keyword list<int> pages_removed:       capture numbers of pages that were
+                                        removed
+:keyword list<Page> pages_updated:      pages that were modified
+:keyword bool resync:                   whether the changed pages were left
+                                        out and all pages have to be re-read
+:keyword list<TocEntry> table_of_contents: the new table of contents, only
+                                        present if it was changed
+""")
+
 on_removed = signals.signal('workflow:removed', doc="""\
 Sent by the removing code when a workflow was deleted.
 
@@ -90,6 +125,107 @@ Sent by a :class:`Workflow` after a capture failed.
                                 failure
 """)
 
+on_crop_progressed = signals.signal('workflow:crop-progressed', doc="""\
+Sent by a :class:`Workflow` when a page was cropped as part of a batch.
+
+:argument :class:`Workflow`:    the Workflow the page belongs to
+:keyword :class:`Page` page:    the page that was cropped
+:keyword float progress:        the progress of the batch as a value between
+                                0 and 1
+""")
+
+
+def _crop_image(fname, left, top, width=None, height=None):
+    """ Crop an image in place.
+
+    JPEG images are cropped losslessly if `jpegtran-cffi` is available.
+    Lives on the module level, so it can be run in a process pool.
+
+    :param fname:   Path to the image
+    :type fname:    unicode
+    :param left:    X coordinate of crop boundary
+    :param top:     Y coordinate of crop boundary
+    :param width:   Width of crop box, defaults to the remaining width
+    :param height:  Height of crop box, defaults to the remaining height
+    :returns:       Whether the image was modified
+    :rtype:         bool
+    """
+    use_jpegtran = (HAS_JPEGTRAN and
+                    fname.lower().endswith(('.jpg', '.jpeg')))
+    if use_jpegtran:
+        img = JPEGImage(fname)
+        img_width, img_height = img.width, img.height
+    else:
+        # PIL is only a hard dependency without jpegtran-cffi, but other
+        # formats can't be handled by the latter
+        from PIL import Image
+        img = Image.open(fname)
+        img_width, img_height = img.size
+    if width is None or width > (img_width - left):
+        width = img_width - left
+    if height is None or height > (img_height - top):
+        height = img_height - top
+    if (left, top, width, height) == (0, 0, img_width, img_height):
+        logger.warn("No-op crop parameters for \"{0}\", skipping!"
+                    .format(fname))
+        return False
+    logger.debug("Cropping \"{0}\" to x:{1} y:{2} w:{3} h:{4}"
+                 .format(fname, left, top, width, height))
+    if use_jpegtran:
+        img.crop(left, top, width=width, height=height).save(fname)
+    else:
+        img.crop((left, top, left+width, top+height)).save(fname)
+    return True
+
+
+def _read_journal(journal_path):
+    """ Read all records from a page journal.
+
+    A record that was only partially written, e.g. because the process was
+    killed while appending to the journal, is skipped.
+
+    :param journal_path:    Path to the journal
+    :type journal_path:     :py:class:`pathlib.Path`
+    :returns:               The journal records in the order they were
+                            written
+    :rtype:                 list of dict
+    """
+    records = []
+    with journal_path.open('r') as fp:
+        for line in fp:
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logger.warning("Skipping incomplete record in page journal {0}"
+                               .format(journal_path))
+    return records
+
+
+def _get_last_modified(path, algorithms=None):
+    """ Get the time a workflow was last modified.
+
+    We use the most recent of the modified timestamps of the checksum files
+    of the BagIt directory, since any relevant changes to the workflow's
+    structure will cause a change in at least one file hash.
+
+    :param path:        Path to the workflow directory
+    :type path:         :py:class:`pathlib.Path`
+    :param algorithms:  Checksum algorithms of the bag's manifests, all
+                        existing manifests are used if not given
+    :type algorithms:   list of unicode
+    :rtype:             :py:class:`datetime.datetime`
+    """
+    if algorithms is None:
+        fpaths = (list(path.glob('manifest-*.txt')) +
+                  list(path.glob('tagmanifest-*.txt')))
+    else:
+        fpaths = [path/'{0}-{1}.txt'.format(prefix, alg)
+                  for alg in algorithms
+                  for prefix in ('manifest', 'tagmanifest')]
+    return datetime.fromtimestamp(max(p.stat().st_mtime for p in fpaths))
+
 
 def _signal_on_error(signal):
     """ Decorator for emitting a signal when a function throws an exception.
@@ -128,12 +264,143 @@ class ValidationError(ValueError):
         self.errors = kwargs
 
 
+class ProcessingStep(object):
+    """ A single entry in the processing lineage of a page.
+
+    :attr plugin:       Name of the plugin that produced the file
+    :attr path:         Path to the produced file
+    :type path:         :py:class:`pathlib.Path`
+    :attr timestamp:    When the file was produced, as a UNIX timestamp
+    :type timestamp:    float
+    :attr is_image:     Whether the file is an image (as opposed to e.g. OCR
+                        output)
+    :type is_image:     bool
+    :attr input_checksum:       Checksum of the raw image the file was
+                                produced from
+    :type input_checksum:       unicode or None
+    :attr config_fingerprint:   Fingerprint of the configuration of the
+                                plugin and of all plugins that ran before it
+    :type config_fingerprint:   unicode or None
+    """
+    __slots__ = (b"plugin", b"path", b"timestamp", b"is_image",
+                 b"input_checksum", b"config_fingerprint")
+
+    #: File extensions that designate image files
+    IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tif', '.tiff')
+
+    def __init__(self, plugin, path, timestamp=None, is_image=None,
+                 input_checksum=None, config_fingerprint=None):
+        self.plugin = plugin
+        self.path = path
+        self.timestamp = timestamp if timestamp is not None else time.time()
+        if is_image is None:
+            is_image = path.suffix.lower() in self.IMAGE_EXTENSIONS
+        self.is_image = is_image
+        self.input_checksum = input_checksum
+        self.config_fingerprint = config_fingerprint
+
+    def __repr__(self):
+        return (
+            u"ProcessingStep(plugin={0}, path={1}, timestamp={2}, "
+            u"is_image={3})"
+        ).format(repr(self.plugin), repr(self.path), repr(self.timestamp),
+                 repr(self.is_image))
+
+    def to_dict(self):
+        """ Serialize entity to a dict.
+
+        Used by :py:class:`spreads.util.CustomJSONEncoder`.
+        """
+        return {
+            'plugin': self.plugin,
+            'path': self.path,
+            'timestamp': self.timestamp,
+            'is_image': self.is_image,
+            'input_checksum': self.input_checksum,
+            'config_fingerprint': self.config_fingerprint
+        }
+
+
+class ProcessedImages(dict):
+    """ Mapping of plugin names to the paths of the files they produced for
+    a page, that records the order in which the files were produced.
+
+    Behaves like a regular :py:class:`dict`, so plugins can keep assigning
+    their output files to it. Every assignment moves the plugin to the end of
+    :py:attr:`lineage`.
+
+    :attr lineage:  Processing steps, ordered from least to most recent
+    :type lineage:  list of :py:class:`ProcessingStep`
+    """
+    def __init__(self, *args, **kwargs):
+        super(ProcessedImages, self).__init__()
+        self.lineage = []
+        self.update(*args, **kwargs)
+
+    @classmethod
+    def from_lineage(cls, lineage):
+        """ Restore the mapping from a recorded lineage.
+
+        :param lineage: Processing steps, from least to most recent
+        :type lineage:  list of :py:class:`ProcessingStep`
+        :rtype:         :py:class:`ProcessedImages`
+        """
+        rv = cls()
+        for step in lineage:
+            rv._record(step)
+        return rv
+
+    def _record(self, step):
+        self.lineage = [s for s in self.lineage if s.plugin != step.plugin]
+        self.lineage.append(step)
+        super(ProcessedImages, self).__setitem__(step.plugin, step.path)
+
+    def __setitem__(self, plugin, path):
+        self._record(ProcessingStep(plugin, path))
+
+    def __delitem__(self, plugin):
+        super(ProcessedImages, self).__delitem__(plugin)
+        self.lineage = [s for s in self.lineage if s.plugin != plugin]
+
+    def update(self, *args, **kwargs):
+        for plugin, path in dict(*args, **kwargs).iteritems():
+            self[plugin] = path
+
+    def setdefault(self, plugin, path=None):
+        if plugin not in self:
+            self[plugin] = path
+        return self[plugin]
+
+    def pop(self, plugin, *args):
+        if plugin in self:
+            self.lineage = [s for s in self.lineage if s.plugin != plugin]
+        return super(ProcessedImages, self).pop(plugin, *args)
+
+    def popitem(self):
+        plugin, path = super(ProcessedImages, self).popitem()
+        self.lineage = [s for s in self.lineage if s.plugin != plugin]
+        return plugin, path
+
+    def clear(self):
+        super(ProcessedImages, self).clear()
+        self.lineage = []
+
+    def copy(self):
+        return ProcessedImages.from_lineage(
+            copy.copy(s) for s in self.lineage)
+
+    def __reduce__(self):
+        return (ProcessedImages.from_lineage, (self.lineage,))
+
+
 class Page(object):
     """ Entity that holds information about a single page.
 
     :attr raw_image:        The path to the raw image.
     :attr processed_images: A dictionary of plugin names mapped to the path of
-                            a processed file.
+                            a processed file. Keeps track of the order the
+                            files were produced in.
+    :type processed_images: :py:class:`ProcessedImages`
     :attr capture_num:      The capture number of the page, i.e. at what
                             position in the workflow it was recorded, including
                             aborted and retaken shots.
@@ -155,7 +422,9 @@ class Page(object):
     def __init__(self, raw_image, sequence_num=None, capture_num=None,
                  page_label=None, processed_images=None):
         self.raw_image = raw_image
-        self.processed_images = processed_images or {}
+        if not isinstance(processed_images, ProcessedImages):
+            processed_images = ProcessedImages(processed_images or {})
+        self.processed_images = processed_images
         if capture_num:
             self.capture_num = capture_num
         else:
@@ -177,23 +446,29 @@ class Page(object):
         else:
             self.page_label = unicode(self.sequence_num)
 
+    @property
+    def lineage(self):
+        """ Processing steps for the page, from least to most recent.
+
+        :rtype: list of :py:class:`ProcessingStep`
+        """
+        return self.processed_images.lineage
+
     def get_latest_processed(self, image_only=True):
-        """ Get the least recent postprocessed file
+        """ Get the most recent postprocessed file.
+
+        Determined from the page's processing lineage, i.e. without
+        accessing the filesystem.
 
         :param image_only:  Only return image files (e.g. no OCR files)
         :type image_only:   bool
-        :returns:           Path to least recent postprocessed file
+        :returns:           Path to most recent postprocessed file
         :rtype:             :py:class:`pathlib.Path`
         """
-        img_exts = ('.jpg', '.jpeg', '.png', '.tif', '.tiff')
-        paths = self.processed_images.values()
-        if image_only:
-            paths = [p for p in paths if p.suffix.lower() in img_exts]
-        try:
-            return sorted(paths,
-                          key=lambda p: p.stat().st_mtime, reverse=True)[0]
-        except IndexError:
-            return None
+        for step in reversed(self.processed_images.lineage):
+            if step.is_image or not image_only:
+                return step.path
+        return None
 
     def to_dict(self):
         """ Serialize entity to a dict.
@@ -206,6 +481,7 @@ class Page(object):
             'page_label': self.page_label,
             'raw_image': self.raw_image,
             'processed_images': self.processed_images,
+            'lineage': self.processed_images.lineage,
         }
 
 
@@ -246,6 +522,217 @@ class TocEntry(object):
         }
 
 
+class WorkflowSummary(object):
+    """ Lightweight summary of a workflow.
+
+    The summary is read from a few small files in the workflow's bag,
+    without loading the complete :py:class:`Workflow` (i.e. its pages,
+    configuration and plugins). The full workflow is only instantiated on
+    first access of :py:attr:`workflow`.
+
+    :attr path:         Path to directory containing the workflow's data
+    :type path:         :py:class:`pathlib.Path`
+    :attr id:           UUID for the workflow
+    :attr slug:         ASCIIfied version of workflow title without spaces
+    :attr title:        Title of the workflow
+    :attr page_count:   Number of pages in the workflow
+    :type page_count:   int
+    :attr last_modified: Time of last modification
+    :type last_modified: :py:class:`datetime.datetime`
+    """
+    __slots__ = (b"path", b"id", b"slug", b"title", b"page_count",
+                 b"last_modified")
+
+    def __init__(self, path, id, slug, title, page_count, last_modified):
+        self.path = path
+        self.id = id
+        self.slug = slug
+        self.title = title
+        self.page_count = page_count
+        self.last_modified = last_modified
+
+    @classmethod
+    def from_workflow(cls, workflow):
+        """ Create a summary for an already loaded workflow.
+
+        :param workflow:    Workflow to summarize
+        :type workflow:     :py:class:`Workflow`
+        :rtype:             :py:class:`WorkflowSummary`
+        """
+        return cls(path=workflow.path, id=workflow.id, slug=workflow.slug,
+                   title=workflow.metadata.get('title'),
+                   page_count=len(workflow.pages),
+                   last_modified=workflow.last_modified)
+
+    @classmethod
+    def from_path(cls, path):
+        """ Read the summary for a workflow from its directory.
+
+        Only ``bag-info.txt``, ``dcmeta.txt`` and the page journal are read,
+        the page count is taken from the ``Spreads-Page-Count`` bag-info
+        field that is updated whenever the pages are compacted into
+        ``pagemeta.json``.
+
+        :param path:    Path to the workflow directory
+        :type path:     :py:class:`pathlib.Path`
+        :returns:       The summary or None if the directory does not contain
+                        a bag (e.g. directories from older versions)
+        :rtype:         :py:class:`WorkflowSummary` or None
+        """
+        if not (path/'bag-info.txt').exists():
+            return None
+        info = bagit.BagInfo(unicode(path/'bag-info.txt'))
+        if 'spreads-id' not in info:
+            return None
+        if 'spreads-page-count' in info:
+            page_count = int(info['spreads-page-count'])
+        elif (path/'pagemeta.json').exists():
+            # Bags from older versions don't store the page count
+            with (path/'pagemeta.json').open('r') as fp:
+                page_count = len(json.load(fp))
+        else:
+            page_count = 0
+        journal_path = path/'pagemeta.journal'
+        if journal_path.exists():
+            for record in _read_journal(journal_path):
+                if record['action'] == 'add':
+                    page_count += 1
+                elif record['action'] == 'remove':
+                    page_count -= len(record['pages'])
+        last_modified = _get_last_modified(path)
+        return cls(path=path, id=info['spreads-id'],
+                   slug=info.get('spreads-slug'),
+                   title=Metadata(path).get('title'),
+                   page_count=page_count, last_modified=last_modified)
+
+    @property
+    def workflow(self):
+        """ The full :py:class:`Workflow`, instantiated on first access. """
+        return Workflow.load(self.path)
+
+    @property
+    def status(self):
+        """ Status of the workflow.
+
+        Workflows that were not loaded yet are always idle.
+        """
+        workflow = Workflow.get_cached(self.path)
+        if workflow is None:
+            return {'step': None, 'step_progress': None, 'prepared': False}
+        return workflow.status
+
+    def to_dict(self):
+        """ Serialize entity to a dict.
+
+        Used by :py:class:`spreads.util.CustomJSONEncoder`.
+        """
+        return {
+            'id': self.id,
+            'slug': self.slug,
+            'title': self.title,
+            'page_count': self.page_count,
+            'status': self.status,
+            'last_modified': self.last_modified,
+        }
+
+
+class WorkflowCache(object):
+    """ Bounded cache of :py:class:`Workflow` instances with a
+    least-recently-used eviction policy.
+
+    Besides a maximum number of instances, the cache has a memory budget,
+    expressed as the total number of pages of all cached workflows, since
+    these make up the bulk of a workflow's memory footprint.
+    Workflows that are busy (i.e. that are capturing, processing or still
+    have pending background tasks) are never evicted. Evicted workflows
+    release their background executor and plugin instances.
+
+    :attr max_size:     Maximum number of cached workflows
+    :type max_size:     int
+    :attr max_pages:    Maximum number of pages in all cached workflows
+    :type max_pages:    int
+    """
+    def __init__(self, max_size=32, max_pages=50000):
+        self.max_size = max_size
+        self.max_pages = max_pages
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, path):
+        """ Get a cached workflow and mark it as recently used.
+
+        :param path:    Path to the workflow directory
+        :type path:     :py:class:`pathlib.Path`
+        :rtype:         :py:class:`Workflow` or None
+        """
+        with self._lock:
+            workflow = self._entries.pop(path, None)
+            if workflow is not None:
+                self._entries[path] = workflow
+            return workflow
+
+    def add(self, workflow):
+        """ Add a workflow to the cache, possibly evicting other workflows.
+
+        An already cached instance for the same path will be replaced and
+        released.
+
+        :param workflow:    Workflow to add
+        :type workflow:     :py:class:`Workflow`
+        """
+        with self._lock:
+            replaced = self._entries.pop(workflow.path, None)
+            self._entries[workflow.path] = workflow
+            if replaced is not None and replaced is not workflow:
+                logger.debug("Replacing cached workflow {0}"
+                             .format(workflow.path))
+                replaced.release()
+            self._evict()
+
+    def remove(self, workflow):
+        """ Remove a workflow from the cache.
+
+        :param workflow:    Workflow to remove
+        :type workflow:     :py:class:`Workflow`
+        """
+        with self._lock:
+            if self._entries.get(workflow.path) is workflow:
+                del self._entries[workflow.path]
+
+    def clear(self):
+        """ Remove all workflows from the cache. """
+        with self._lock:
+            self._entries.clear()
+
+    def values(self):
+        """ Get all cached workflows, least recently used first.
+
+        :rtype:     list of :py:class:`Workflow`
+        """
+        with self._lock:
+            return self._entries.values()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _evict(self):
+        """ Evict least recently used workflows until the cache is within its
+        limits again.
+        """
+        num_pages = sum(len(wf.pages) for wf in self._entries.itervalues())
+        for path, workflow in self._entries.items():
+            within_limits = (len(self._entries) <= self.max_size and
+                             num_pages <= self.max_pages)
+            if within_limits:
+                break
+            if workflow.is_busy:
+                continue
+            logger.debug("Evicting workflow {0} from cache".format(path))
+            del self._entries[path]
+            num_pages -= len(workflow.pages)
+            workflow.release()
+
+
 class Workflow(object):
     """ Core entity for managing scanning workflows.
 
@@ -278,13 +765,22 @@ class Workflow(object):
     :type out_files:    list of :py:class:`pathlib.Path`
     """
     # Class-wide cache of :py:class:`Workflow` instances
-    _cache = {}
-
-    def __new__(cls, *args, **kwargs):
-        """ Automatically cache every new :py:class:`Workflow` instance. """
-        on_created.connect(lambda sender, **kwargs: cls._add_to_cache(sender),
-                           weak=False)
-        return super(Workflow, cls).__new__(cls, *args, **kwargs)
+    _cache = WorkflowCache()
+    # Maximum number of pages that are sent with an ``on_changed`` signal,
+    # beyond that receivers are asked to re-read all pages
+    max_event_pages = 50
+    # Directories and tag files in the bag that are derived from the
+    # captured pages and therefore kept when applying a patch
+    DERIVED_PATHS = (os.path.join('data', 'done'), os.path.join('data', 'out'),
+                     'output-manifests')
+    # Bags hash their files on the shared ``hashing`` lane instead of
+    # starting a pool of their own
+    _hashing_service = bagit.HashingService(
+        num_workers=util.executors.lanes['hashing'][1],
+        executor=util.LaneExecutor(util.executors, 'hashing'))
+    # Persistent catalogs (:py:class:`spreads.catalog.WorkflowCatalog`),
+    # mapped from the location of the workflows they contain
+    _catalogs = {}
 
     @classmethod
     def create(cls, location, metadata=None, config=None):
@@ -311,18 +807,75 @@ class Workflow(object):
             raise ValidationError(
                 name="A workflow with that title already exists")
         wf = cls(path=path, config=config, metadata=metadata)
+        cls._cache.add(wf)
         return wf
 
     @classmethod
-    def _add_to_cache(cls, workflow):
-        location = workflow.path.parent
-        if location not in cls._cache:
-            cls._cache[location] = [workflow]
-        elif workflow not in Workflow._cache[location]:
-            cls._cache[location].append(workflow)
+    def set_catalog(cls, catalog):
+        """ Use a persistent catalog for looking up workflows in the
+        catalog's location.
+
+        :param catalog: The catalog to use
+        :type catalog:  :py:class:`spreads.catalog.WorkflowCatalog`
+        """
+        cls._catalogs[catalog.location] = catalog
 
     @classmethod
-    def find_all(cls, location, key='slug', reload=False):
+    def get_cached(cls, path):
+        """ Get an already instantiated workflow from the cache.
+
+        :param path:    Path to the workflow directory
+        :type path:     unicode or :py:class:`pathlib.Path`
+        :rtype:         :py:class:`Workflow` or None
+        """
+        if not isinstance(path, Path):
+            path = Path(path)
+        return cls._cache.get(path)
+
+    @classmethod
+    def load(cls, path):
+        """ Get the workflow stored at the given path, either from the cache
+        or by instantiating it.
+
+        :param path:    Path to the workflow directory
+        :type path:     unicode or :py:class:`pathlib.Path`
+        :rtype:         :py:class:`Workflow`
+        """
+        if not isinstance(path, Path):
+            path = Path(path)
+        workflow = cls.get_cached(path)
+        if workflow is None:
+            logger.debug("Cache missed, instantiating workflow from {0}."
+                         .format(path))
+            workflow = cls(path)
+            cls._cache.add(workflow)
+        return workflow
+
+    @classmethod
+    def reload(cls, path):
+        """ Re-read the workflow stored at the given path from disk, e.g.
+        after its files were modified externally.
+
+        The new instance replaces a cached instance, which is released.
+
+        :param path:    Path to the workflow directory
+        :type path:     unicode or :py:class:`pathlib.Path`
+        :rtype:         :py:class:`Workflow`
+        """
+        if not isinstance(path, Path):
+            path = Path(path)
+        workflow = cls(path)
+        cls._cache.add(workflow)
+        return workflow
+
+    @staticmethod
+    def is_workflow_dir(path):
+        """ Check if a directory contains a workflow. """
+        return (path.is_dir() and
+                ((path/'bagit.txt').exists() or (path/'raw').exists()))
+
+    @classmethod
+    def find_all(cls, location, key='slug', reload=False, summary=False):
         """ List all workflows in the given location.
 
         :param location:    Location where the workflows are located
@@ -331,6 +884,9 @@ class Workflow(object):
         :type key:          str/unicode
         :param reload:      Do not load workflows from cache
         :type reload:       bool
+        :param summary:     Only return lightweight summaries, the full
+                            workflows will be instantiated on demand
+        :type summary:      bool
         :return:            All found workflows
         :rtype:             dict
         """
@@ -338,29 +894,64 @@ class Workflow(object):
             location = Path(location)
         if key not in ('slug', 'id'):
             raise ValueError("'key' must be one of ('id', 'slug')")
-        if location in cls._cache and not reload:
-            found = cls._cache[location]
-        else:
-            found = []
+        if summary:
+            return {getattr(s, key): s
+                    for s in cls._find_summaries(location, reload)}
+        found = []
         for candidate in location.iterdir():
-            is_workflow = (location.is_dir() and
-                           ((candidate/'bagit.txt').exists
-                            or (candidate/'raw').exists))
-            if not is_workflow:
+            if not cls.is_workflow_dir(candidate):
                 continue
-            if not next((wf for wf in found if wf.path == candidate), None):
+            workflow = None if reload else cls.get_cached(candidate)
+            if workflow is None:
                 logging.debug(
                     "Cache missed, instantiating workflow from {0}."
                     .format(candidate))
                 workflow = cls(candidate)
-                found.append(workflow)
-        cls._cache[location] = found
-        return {getattr(wf, key): wf for wf in cls._cache[location]}
+                cls._cache.add(workflow)
+            found.append(workflow)
+        return {getattr(wf, key): wf for wf in found}
+
+    @classmethod
+    def _find_summaries(cls, location, reload=False):
+        """ Get summaries for all workflows in the given location.
+
+        Workflows that are already loaded are summarized from memory, all
+        other workflows from a few small files in their bag. Directories that
+        can not be summarized (e.g. from older versions) are loaded fully.
+
+        :param location:    Location where the workflows are located
+        :type location:     :py:class:`pathlib.Path`
+        :param reload:      Do not summarize workflows from cache
+        :type reload:       bool
+        :rtype:             list of :py:class:`WorkflowSummary`
+        """
+        summaries = []
+        if location in cls._catalogs:
+            for summary in cls._catalogs[location].summaries(reload):
+                workflow = None if reload else cls.get_cached(summary.path)
+                if workflow is not None:
+                    summary = WorkflowSummary.from_workflow(workflow)
+                summaries.append(summary)
+            return summaries
+        for candidate in location.iterdir():
+            if not cls.is_workflow_dir(candidate):
+                continue
+            workflow = None if reload else cls.get_cached(candidate)
+            if workflow is not None:
+                summaries.append(WorkflowSummary.from_workflow(workflow))
+                continue
+            summary = WorkflowSummary.from_path(candidate)
+            if summary is None:
+                summary = WorkflowSummary.from_workflow(cls.load(candidate))
+            summaries.append(summary)
+        return summaries
 
     @classmethod
     def find_by_id(cls, location, id):
         """ Try to locate a workflow with the given id in a directory.
 
+        Only the matching workflow is instantiated.
+
         :param location:    Base directory that contains workflows to be
                             searched among
         :type location:     unicode or :py:class:`pathlib.Path`
@@ -369,8 +960,11 @@ class Workflow(object):
         """
         if not isinstance(location, Path):
             location = Path(location)
+        if location in cls._catalogs:
+            summary = cls._catalogs[location].find('id', id)
+            return summary.workflow if summary is not None else None
         try:
-            return cls.find_all(location, key='id')[id]
+            return cls.find_all(location, key='id', summary=True)[id].workflow
         except KeyError:
             return None
 
@@ -378,6 +972,8 @@ class Workflow(object):
     def find_by_slug(cls, location, slug):
         """ Try to locate a workflow that matches a given slug in a directory.
 
+        Only the matching workflow is instantiated.
+
         :param location:    Base directory that contains workflows to be
                             searched among
         :type location:     unicode or :py:class:`pathlib.Path`
@@ -387,8 +983,12 @@ class Workflow(object):
         """
         if not isinstance(location, Path):
             location = Path(location)
+        if location in cls._catalogs:
+            summary = cls._catalogs[location].find('slug', slug)
+            return summary.workflow if summary is not None else None
         try:
-            return cls.find_all(location, key='slug')[slug]
+            return (cls.find_all(location, key='slug', summary=True)[slug]
+                    .workflow)
         except KeyError:
             return None
 
@@ -406,9 +1006,134 @@ class Workflow(object):
                 "Cannot remove a workflow while it is busy."
                 " (active step: '{0}')".format(workflow.status['step']))
         shutil.rmtree(unicode(workflow.path))
-        cls._cache[workflow.path.parent].remove(workflow)
+        cls._cache.remove(workflow)
         on_removed.send(senderId=workflow.id)
 
+    @classmethod
+    def apply_patch(cls, workflow, patch_dir):
+        """ Update a workflow to match another copy of it.
+
+        The patch is applied to a staged copy of the workflow, which is only
+        swapped in once it matches the other copy. If the patch fails, the
+        workflow is left untouched. To keep staging cheap, the payload of
+        the staged copy is hard-linked where possible.
+
+        Files that were derived on this copy (see :py:attr:`DERIVED_PATHS`)
+        are kept even though the other copy lacks them, so pages that did
+        not change do not have to be processed again.
+
+        :param workflow:    Workflow to be patched
+        :type workflow:     :py:class:`Workflow`
+        :param patch_dir:   Directory with the manifests of the other copy
+                            and all files that
+                            :py:meth:`spreads.vendor.bagit.Bag.diff` reported
+                            for them
+        :type patch_dir:    unicode or :py:class:`pathlib.Path`
+        :returns:           The patched workflow, which replaces the old
+                            instance in the cache
+        :rtype:             :py:class:`Workflow`
+        :raises:            :py:class:`spreads.vendor.bagit.BagError` if the
+                            patch could not be applied
+        """
+        if workflow.is_busy:
+            raise util.SpreadsException(
+                "Cannot patch a workflow while it is busy.")
+        path = workflow.path
+        # The staging directory is not a workflow directory itself, so it
+        # does not show up when looking for workflows in the meantime
+        staging_dir = Path(tempfile.mkdtemp(dir=unicode(path.parent)))
+        try:
+            staged_path = staging_dir/'staged'
+            cls._stage_copy(path, staged_path)
+            staged_bag = bagit.Bag(unicode(staged_path),
+                                   hashing_service=cls._hashing_service,
+                                   checksum_cache=True)
+            staged_bag.apply_patch(unicode(patch_dir),
+                                   keep=cls.DERIVED_PATHS)
+            # The page journal is not part of the bag, the other copy's
+            # pages are all in the patched pagemeta.json
+            journal_path = staged_path/'pagemeta.journal'
+            if journal_path.exists():
+                journal_path.unlink()
+            cls._merge_processing_state(workflow.pages, staged_bag)
+            staged_bag.save_checksum_cache()
+            backup_path = staging_dir/'backup'
+            path.rename(backup_path)
+            try:
+                staged_path.rename(path)
+            except OSError:
+                backup_path.rename(path)
+                raise
+        finally:
+            shutil.rmtree(unicode(staging_dir))
+        return cls.reload(path)
+
+    @staticmethod
+    def _merge_processing_state(old_pages, bag):
+        """ Carry the processing results of a workflow over to a patched
+        copy of it.
+
+        Pages that are still there and were not processed on the other copy
+        take over the processed files and lineage of their old version.
+        Since retaken pages are captured under a new number, they are
+        processed again. The processed files of all other pages are removed
+        from the bag.
+
+        :param old_pages:   Pages of the workflow before it was patched
+        :type old_pages:    list of :py:class:`Page`
+        :param bag:         Bag of the patched copy
+        :type bag:          :py:class:`spreads.vendor.bagit.Bag`
+        """
+        # Paths are serialized relative to the workflow directory, so they
+        # apply to the patched copy as well
+        old_pages = {p['capture_num']: p for p in json.loads(
+            json.dumps(old_pages, cls=util.CustomJSONEncoder))}
+        fpath = Path(bag.path)/'pagemeta.json'
+        with fpath.open('r') as fp:
+            pages = json.load(fp)
+        for page in pages:
+            old_page = old_pages.get(page['capture_num'])
+            if old_page is None or page['processed_images']:
+                continue
+            page['processed_images'] = old_page['processed_images']
+            page['lineage'] = old_page['lineage']
+
+        def get_files(pages):
+            return set(step['path'] for page in pages
+                       for step in page.get('lineage', []))
+        obsolete = get_files(old_pages.values()) - get_files(pages)
+        with bag.batch():
+            bag.remove_payload(*(
+                os.path.join(bag.path, relpath) for relpath in obsolete
+                if os.path.exists(os.path.join(bag.path, relpath))))
+            with fpath.open('wb') as fp:
+                json.dump(pages, fp, indent=2, ensure_ascii=False)
+            bag.add_tagfiles(unicode(fpath))
+
+    @staticmethod
+    def _stage_copy(src, dst):
+        """ Copy a workflow directory for staging changes to it.
+
+        Payload files are only replaced or removed by the bag, never
+        modified in place, so they are hard-linked if the platform supports
+        it. All other files are copied.
+
+        :param src:     Workflow directory
+        :type src:      :py:class:`pathlib.Path`
+        :param dst:     Target directory, must not exist
+        :type dst:      :py:class:`pathlib.Path`
+        """
+        link = getattr(os, 'link', shutil.copy2)
+        for dirpath, dirnames, filenames in os.walk(unicode(src)):
+            relpath = os.path.relpath(dirpath, unicode(src))
+            target_dir = os.path.normpath(os.path.join(unicode(dst), relpath))
+            os.mkdir(target_dir)
+            is_payload = relpath.split(os.sep)[0] == 'data'
+            for fname in filenames:
+                (link if is_payload else shutil.copy2)(
+                    os.path.join(dirpath, fname),
+                    os.path.join(target_dir, fname))
+
     def __init__(self, path, config=None, metadata=None):
         self._logger = logging.getLogger('Workflow')
         self._logger.debug("Initializing workflow {0}".format(path))
@@ -422,15 +1147,6 @@ class Workflow(object):
             path = Path(path)
         self.path = path
         is_new = not self.path.exists()
-        try:
-            self.bag = bagit.Bag(unicode(self.path))
-        except bagit.BagError:
-            # Convert non-bagit directories from older versions
-            self.bag = bagit.Bag.convert_directory(unicode(self.path))
-        if not self.slug:
-            self.slug = util.slugify(unicode(self.path.name))
-        if not self.id:
-            self.id = unicode(uuid.uuid4())
         # See if supplied `config` is already a valid ConfigView object
         if isinstance(config, confit.ConfigView):
             self.config = config
@@ -438,6 +1154,24 @@ class Workflow(object):
             self.config = config.as_view()
         else:
             self.config = self._load_config(config)
+        # The algorithms are only used for new bags, existing bags keep
+        # the algorithms of their manifests
+        checksums = None
+        if 'checksum_algorithms' in self.config.keys():
+            checksums = self.config['checksum_algorithms'].as_str_seq()
+        try:
+            self.bag = bagit.Bag(unicode(self.path), checksums=checksums,
+                                 hashing_service=self._hashing_service,
+                                 checksum_cache=True)
+        except bagit.BagError:
+            # Convert non-bagit directories from older versions
+            self.bag = bagit.Bag.convert_directory(
+                unicode(self.path), checksums=checksums,
+                hashing_service=self._hashing_service)
+        if not self.slug:
+            self.slug = util.slugify(unicode(self.path.name))
+        if not self.id:
+            self.id = unicode(uuid.uuid4())
         #: :py:class:`spreads.metadata.Metadata` instance that backs the
         #: corresponding getter and setter
         self._metadata = Metadata(self.path)
@@ -449,11 +1183,23 @@ class Workflow(object):
         #: Lock that is held when a shot is being executed during the capture
         #: phase
         self._capture_lock = threading.RLock()
+        #: Version of the pages and table of contents, incremented with
+        #: every ``on_changed`` signal
+        self.version = 0
+        #: Identifier of this instance. The version starts over whenever the
+        #: workflow is re-instantiated (e.g. after a restart or when it was
+        #: evicted from the cache), so versions from different epochs can
+        #: not be compared.
+        self.epoch = unicode(uuid.uuid4())
+        self._version_lock = threading.Lock()
+        #: Lock that is held while the page journal is written to, since
+        #: pages are checkpointed from multiple threads during processing
+        self._journal_lock = threading.Lock()
         #: List of :py:class:`spreads.plugin.DeviceDriver` instances that
         #: backs the corresponding getters and setters
         self._devices = None
-        # Thread pool for background tasks
-        self._threadpool = concfut.ThreadPoolExecutor(max_workers=1)
+        #: Executor for background tasks, backs :py:attr:`_threadpool`
+        self._executor = None
         # List of unfinished :py:class:`concurrent.futures.Future` instances
         self._pending_tasks = []
 
@@ -463,16 +1209,61 @@ class Workflow(object):
             for name, cls in plugin.get_plugins(*self.config["plugins"]
                                                 .get()).iteritems()
             if not cls.__bases__ == (plugin.SubcommandHooksMixin,)]
-        self._plugins = [cls(self.config) for name, cls in plugin_classes]
+        #: Plugin instances, backs :py:attr:`_plugins`
+        self._plugin_instances = None
         self.config['plugins'] = [name for name, cls in plugin_classes]
         self._save_config()
 
         self.pages = self._load_pages()
+        self._reindex_pages()
         self.table_of_contents = self._load_toc()
 
         if is_new:
             on_created.send(self, workflow=self)
 
+    @property
+    def _plugins(self):
+        """ Plugin instances for the workflow, instantiated on demand. """
+        if self._plugin_instances is None:
+            self._plugin_instances = [
+                plugin.get_plugin_instance(name, cls, self.config)
+                for name, cls in
+                plugin.get_plugins(*self.config["plugins"].get()).iteritems()]
+        return self._plugin_instances
+
+    @property
+    def _threadpool(self):
+        """ Executor for background tasks, created on demand.
+
+        Tasks are run one after another on the shared ``hashing`` lane of
+        :py:data:`spreads.util.executors`, since they all modify the bag.
+        """
+        if self._executor is None:
+            self._executor = util.SerialExecutor(util.executors, 'hashing')
+        return self._executor
+
+    @property
+    def is_busy(self):
+        """ Whether the workflow is in an active step or has unfinished
+        background tasks.
+        """
+        self._pending_tasks = [f for f in self._pending_tasks if not f.done()]
+        in_step = (self.status['step'] is not None and
+                   (self.status['step_progress'] is None or
+                    self.status['step_progress'] < 1))
+        return (in_step or self.status['prepared']
+                or bool(self._pending_tasks))
+
+    def release(self):
+        """ Release the background executor and plugin instances.
+
+        Both will be re-created on demand if the workflow is used again.
+        """
+        concfut.wait(self._pending_tasks)
+        self._executor = None
+        self._plugin_instances = None
+        self._devices = None
+
     @property
     def id(self):
         return self.bag.info.get('spreads-id')
@@ -493,13 +1284,8 @@ class Workflow(object):
 
     @property
     def last_modified(self):
-        # We use the most recent of the modified timestamps of the two
-        # checksum files of the BagIt directory, since any relevant changes
-        # to the workflow's structure will cause a change in at least one
-        # file hash.
-        return datetime.fromtimestamp(
-            max(Path(self.path/fname).stat().st_mtime
-                for fname in ('manifest-md5.txt', 'tagmanifest-md5.txt')))
+        return _get_last_modified(self.path,
+                                  self.bag.manifest_files.keys())
 
     @property
     def devices(self):
@@ -521,51 +1307,163 @@ class Workflow(object):
     def is_single_camera(self):
         return len(self.devices) == 1
 
-    def _fix_page_numbers(self, page_to_remove):
-        """ Fix page numbers and numeric page labels if a page was removed. """
+    def find_page_by_capture_num(self, capture_num):
+        """ Look up a page by its capture number.
+
+        :param capture_num: Capture number of the page
+        :type capture_num:  int
+        :rtype:             :py:class:`Page` or None
+        """
+        return self._pages_by_capture_num.get(capture_num)
+
+    def find_page_by_sequence_num(self, sequence_num):
+        """ Look up a page by its sequence number.
+
+        :param sequence_num: Sequence number of the page
+        :type sequence_num:  int
+        :rtype:              :py:class:`Page` or None
+        """
+        return self._pages_by_sequence_num.get(sequence_num)
+
+    def find_page_by_path(self, path):
+        """ Look up the page that a raw or processed file belongs to.
+
+        :param path:    Path to the raw image or one of the processed files
+        :type path:     unicode or :py:class:`pathlib.Path`
+        :rtype:         :py:class:`Page` or None
+        """
+        if not isinstance(path, Path):
+            path = Path(path)
+        return self._pages_by_path.get(path)
+
+    def _index_page(self, page):
+        """ Add a single page to the page indexes. """
+        self._pages_by_capture_num[page.capture_num] = page
+        self._pages_by_sequence_num[page.sequence_num] = page
+        self._pages_by_path[page.raw_image] = page
+        for fpath in page.processed_images.itervalues():
+            self._pages_by_path[fpath] = page
+
+    def _reindex_pages(self):
+        """ Rebuild the page indexes from :py:attr:`pages`.
+
+        Must be called after any change to the page list that is not a
+        simple append (e.g. removals, renumberings or postprocessing).
+        """
+        #: Mapping from capture numbers to :py:class:`Page` objects
+        self._pages_by_capture_num = {}
+        #: Mapping from sequence numbers to :py:class:`Page` objects
+        self._pages_by_sequence_num = {}
+        #: Mapping from raw and processed file paths to :py:class:`Page`
+        #: objects
+        self._pages_by_path = {}
+        for page in self.pages:
+            self._index_page(page)
+
+    def _fix_page_numbers(self, pages_to_remove):
+        """ Remove pages from :py:attr:`pages` and fix the sequence numbers
+        and numeric page labels of the remaining pages.
+
+        All pages are handled in a single pass over the page list: Within
+        a run of consecutive pages that share a numbering scheme (arabic or
+        roman numerals), the labels of the pages following a removed page
+        are decremented by the number of pages removed from that run so
+        far.
+
+        :param pages_to_remove: Pages to remove
+        :type pages_to_remove:  list of :py:class:`Page`
+        """
         def get_num_type(num_str):
-            if page_to_remove.page_label.isdigit():
-                return int, None
-            elif util.RomanNumeral.is_roman(page_to_remove.page_label):
-                return util.RomanNumeral, page_to_remove.page_label.islower()
-            elif num_str == '':
-                return None, None
-
-        # Fix page labels
-        page_idx = self.pages.index(page_to_remove)
-        num_type = get_num_type(page_to_remove.page_label)
-        if num_type != (None, None):
-            for next_page in self.pages[page_idx+1:]:
-                if get_num_type(next_page.page_label) != num_type:
-                    # We can stop re-numbering when the numbering scheme
-                    # has changed
-                    break
-                num = num_type[0](next_page.page_label)
-                next_page.page_label = str(num - 1)
-
-        # Fix sequence numbers:
-        # TODO: Verify....
-        for idx, next_page in enumerate(self.pages[page_idx+1:], page_idx):
-            next_page.sequence_num = idx
-
-    def _fix_table_of_contents(self, page_to_remove):
-        """ Fix table of contents if a page was removed. """
-        def find_page_in_toc(toc):
-            matches = []
-            for entry in toc:
-                if page_to_remove in (entry.start_page, entry.end_page):
-                    matches.append(entry)
-                if entry.children is not None:
-                    matches.extend(find_page_in_toc(entry.children))
-            return matches
-
-        page_idx = self.pages.index(page_to_remove)
-        for entry in find_page_in_toc(self.table_of_contents):
-            if entry.start_page == page_to_remove:
-                entry.start_page = self.pages[page_idx+1]
+            if num_str.isdigit():
+                return int
+            elif util.RomanNumeral.is_roman(num_str.upper()):
+                return util.RomanNumeral
             else:
-                entry.end_page = self.pages[page_idx-1]
-        self._save_toc()
+                return None
+
+        to_remove = set(pages_to_remove)
+        remaining = []
+        first_removed = None
+        num_type = None
+        num_removed = 0
+        for page in self.pages:
+            page_type = get_num_type(page.page_label)
+            if page_type != num_type:
+                # The numbering scheme has changed, so previous removals
+                # no longer affect the labels
+                num_type = page_type
+                num_removed = 0
+            if page in to_remove:
+                if first_removed is None:
+                    first_removed = len(remaining)
+                if num_type is not None:
+                    num_removed += 1
+                continue
+            if num_removed:
+                page.page_label = unicode(
+                    num_type(page.page_label) - num_removed)
+            remaining.append(page)
+        if first_removed is not None:
+            for idx, page in enumerate(remaining[first_removed:],
+                                       first_removed):
+                page.sequence_num = idx
+        self.pages = remaining
+
+    def _fix_table_of_contents(self, pages_to_remove):
+        """ Fix table of contents before pages are removed.
+
+        Entries that start on a removed page will start on the next
+        remaining page, entries that end on a removed page will end on the
+        previous remaining page. Entries that no longer contain any pages are
+        dropped.
+
+        :param pages_to_remove: Pages that are going to be removed
+        :type pages_to_remove:  list of :py:class:`Page`
+        :returns:               Whether the table of contents was modified
+        :rtype:                 bool
+        """
+        if not self.table_of_contents:
+            return False
+        to_remove = set(pages_to_remove)
+        positions = {}
+        next_remaining = [None]*len(self.pages)
+        prev_remaining = [None]*len(self.pages)
+        last = None
+        for idx, page in enumerate(self.pages):
+            positions[page] = idx
+            if page not in to_remove:
+                last = idx
+            prev_remaining[idx] = last
+        last = None
+        for idx in reversed(xrange(len(self.pages))):
+            if self.pages[idx] not in to_remove:
+                last = idx
+            next_remaining[idx] = last
+
+        changed = [False]
+
+        def fix_entries(entries):
+            fixed = []
+            for entry in entries:
+                if entry.children:
+                    entry.children = fix_entries(entry.children)
+                start_idx = positions[entry.start_page]
+                end_idx = positions[entry.end_page]
+                if entry.start_page in to_remove:
+                    start_idx = next_remaining[start_idx]
+                    changed[0] = True
+                if entry.end_page in to_remove:
+                    end_idx = prev_remaining[end_idx]
+                    changed[0] = True
+                if start_idx is None or end_idx is None or start_idx > end_idx:
+                    continue
+                entry.start_page = self.pages[start_idx]
+                entry.end_page = self.pages[end_idx]
+                fixed.append(entry)
+            return fixed
+
+        self.table_of_contents = fix_entries(self.table_of_contents)
+        return changed[0]
 
     def remove_pages(self, *pages):
         """ Remove one or more pages from the workflow.
@@ -576,15 +1474,38 @@ class Workflow(object):
         :param pages:   One or more pages to remove
         :type pages:    :py:class:`Page`
         """
+        if not pages:
+            return
+        # Make sure that the hashing of previous captures has finished, since
+        # we remove the files' entries from the manifest
+        concfut.wait(self._pending_tasks)
+        fpaths = []
         for page in pages:
-            page.raw_image.unlink()
-            for fp in page.processed_images.itervalues():
-                fp.unlink()
-            self._fix_page_numbers(page)
-            self._fix_table_of_contents(page)
-            self.pages.remove(page)
-        self._save_pages()
-        self.bag.update_payload(fast=True)
+            fpaths.append(unicode(page.raw_image))
+            fpaths.extend(unicode(fp)
+                          for fp in page.processed_images.itervalues())
+        # The table of contents is stored with sequence numbers, so it has
+        # to be saved whenever these change, not only when an entry touches
+        # one of the removed pages
+        old_toc = json.dumps(self.table_of_contents,
+                             cls=util.CustomJSONEncoder)
+        self._fix_table_of_contents(pages)
+        old_numbers = {p.capture_num: (p.sequence_num, p.page_label)
+                       for p in self.pages}
+        self._fix_page_numbers(pages)
+        self._reindex_pages()
+        if json.dumps(self.table_of_contents,
+                      cls=util.CustomJSONEncoder) != old_toc:
+            self._save_toc()
+        self._append_to_journal({'action': 'remove',
+                                 'pages': [p.capture_num for p in pages]})
+        self._send_changes(
+            pages_removed=[p.capture_num for p in pages],
+            pages_updated=[p for p in self.pages
+                           if old_numbers[p.capture_num] !=
+                           (p.sequence_num, p.page_label)])
+        # Removes the files from disk and drops them from the manifests
+        self.bag.remove_payload(*fpaths)
 
     def crop_page(self, page, left, top, width=None, height=None, async=False):
         """ Crop a page's raw image.
@@ -598,38 +1519,67 @@ class Workflow(object):
         :return:        The Future object when ``async`` was ``True``
         :rtype:         :py:class:`concurrent.futures.Future`
         """
-        # FIXME: Does this really have to be a Workflow method?
-        def do_crop(fname, left, top, width, height):
-            if HAS_JPEGTRAN:
-                img = JPEGImage(fname)
-            else:
-                img = Image(filename=fname)
-            width = (img.width - left) if width is None else width
-            height = (img.height - top) if height is None else height
-            if width > (img.width - left):
-                width = img.width - left
-            if height > (img.height - top):
-                width = img.height - top
-            if (left, top, width, height) == (0, 0, img.width, img.height):
-                self._logger.warn("No-op crop parameters, skipping!")
-                return
-            self._logger.debug("Cropping \"{0}\" to x:{1} y:{2} w:{3} h:{4}"
-                               .format(fname, left, top, width, height))
-            cropped = img.crop(left, top, width=width, height=height)
-            if HAS_JPEGTRAN:
-                cropped.save(fname)
+        return self.crop_pages([(page, (left, top, width, height))],
+                               async=async)
+
+    def crop_pages(self, crops, async=False):
+        """ Crop the raw images of multiple pages.
+
+        The images are cropped in parallel on the shared ``image`` lane of
+        :py:data:`spreads.util.executors`, afterwards
+        the checksums of all cropped images are updated in the bag's
+        manifest in one go. A ``on_crop_progressed`` signal is emitted for
+        every cropped page.
+
+        :param crops:   Pages and the crop box for each of them, the box
+                        consists of the left and top boundary and the width
+                        and height (which can be None)
+        :type crops:    list of (:py:class:`Page`, tuple) tuples
+        :param async:   Perform the cropping in a background thread
+        :return:        The Future object when ``async`` was ``True``
+        :rtype:         :py:class:`concurrent.futures.Future`
+        """
+        def do_crop():
+            cropped, errors = [], []
+            if len(crops) == 1:
+                # Not worth spinning up a process pool for
+                page, box = crops[0]
+                if _crop_image(unicode(page.raw_image), *box):
+                    cropped.append(page)
+                on_crop_progressed.send(self, page=page, progress=1.0)
             else:
-                img.save(filename=fname)
-                img.close()
+                futures = {
+                    util.executors.submit('image', _crop_image,
+                                          unicode(page.raw_image), *box): page
+                    for page, box in crops}
+                for idx, future in enumerate(concfut.as_completed(futures),
+                                             1):
+                    page = futures[future]
+                    try:
+                        if future.result():
+                            cropped.append(page)
+                    except Exception as exc:
+                        self._logger.error(
+                            "Could not crop \"{0}\"".format(page.raw_image),
+                            exc_info=True)
+                        errors.append(exc)
+                    on_crop_progressed.send(self, page=page,
+                                            progress=idx/len(crops))
+            # Update the checksums even if some crops failed, the other
+            # images were modified nevertheless
+            if cropped:
+                self.bag.add_payload(*(unicode(p.raw_image)
+                                       for p in cropped))
+                self._send_changes(pages_updated=cropped)
+            if errors:
+                raise errors[0]
 
-        fname = unicode(page.raw_image)
         if async:
-            future = self._threadpool.submit(do_crop, fname, left, top, width,
-                                             height)
+            future = self._threadpool.submit(do_crop)
             self._pending_tasks.append(future)
             return future
         else:
-            do_crop(fname, left, top, width, height)
+            do_crop()
 
     @property
     def out_files(self):
@@ -645,12 +1595,13 @@ class Workflow(object):
 
     @metadata.setter
     def metadata(self, value):
-        # Empty old metadata
-        for k in self._metadata:
-            del self._metadata[k]
-        # Save new metadata
-        for k, v in value.items():
-            self._metadata[k] = v
+        with self._metadata.batch():
+            # Empty old metadata
+            for k in list(self._metadata):
+                del self._metadata[k]
+            # Save new metadata
+            for k, v in value.items():
+                self._metadata[k] = v
         on_modified.send(self, changes={'metadata': value})
 
     def save(self):
@@ -659,6 +1610,45 @@ class Workflow(object):
         self._save_toc()
         self._save_pages()
 
+    def compact(self):
+        """ Compact the page journal into ``pagemeta.json``.
+
+        The journal is not part of the bag, so this has to be done before
+        the bag is copied or compared with another copy.
+        """
+        self._save_pages()
+
+    def _send_changes(self, pages_added=(), pages_removed=(),
+                      pages_updated=(), **kwargs):
+        """ Increment :py:attr:`version` and emit a ``on_changed`` signal.
+
+        If more than :py:attr:`max_event_pages` pages were added or updated,
+        the pages are left out and receivers are asked to re-read them.
+
+        :param pages_added:     Pages that were added
+        :type pages_added:      iterable of :py:class:`Page`
+        :param pages_removed:   Capture numbers of pages that were removed
+        :type pages_removed:    iterable of int
+        :param pages_updated:   Pages that were modified
+        :type pages_updated:    iterable of :py:class:`Page`
+        """
+        pages_added = list(pages_added)
+        pages_removed = list(pages_removed)
+        pages_updated = list(pages_updated)
+        resync = (len(pages_added) + len(pages_updated) >
+                  self.max_event_pages)
+        if resync:
+            pages_added, pages_removed, pages_updated = [], [], []
+        # The lock is held while sending, so that receivers get the events
+        # in the order of their versions
+        with self._version_lock:
+            self.version += 1
+            on_changed.send(self, epoch=self.epoch, version=self.version,
+                            pages_added=pages_added,
+                            pages_removed=pages_removed,
+                            pages_updated=pages_updated, resync=resync,
+                            **kwargs)
+
     def _update_status(self, **kwargs):
         """ Update :py:attr:`status` and emit a ``on_modified``  signal. """
         trigger_event = True
@@ -718,16 +1708,12 @@ class Workflow(object):
         :rtype:         list of :py:class:`TocEntry`
         """
         def from_dict(dikt):
-            start_page, end_page = None, None
-            try:
-                start_page = next(p for p in self.pages
-                                  if p.sequence_num == dikt['start_page'])
-                end_page = next(p for p in self.pages
-                                if p.sequence_num == dikt['end_page'])
-            except StopIteration:
+            start_page = self.find_page_by_sequence_num(dikt['start_page'])
+            end_page = self.find_page_by_sequence_num(dikt['end_page'])
+            if start_page is None or end_page is None:
                 missing = 'end_page' if start_page else 'start_page'
                 raise ValidationError(
-                    *{missing: "No page with that sequence number."})
+                    **{missing: "No page with that sequence number."})
             children = [from_dict(x) for x in dikt['children']]
             return TocEntry(dikt['title'], start_page, end_page, children)
 
@@ -741,53 +1727,165 @@ class Workflow(object):
 
     def _save_toc(self):
         """ Write TOC entries to ``toc.json`` in bag. """
-        if not self.table_of_contents:
-            return
         toc_path = self.path / 'toc.json'
+        if not self.table_of_contents and not toc_path.exists():
+            return
         with toc_path.open('wb') as fp:
             json.dump([x.to_dict() for x in self.table_of_contents], fp,
                       cls=util.CustomJSONEncoder, indent=2, ensure_ascii=False)
         self.bag.add_tagfiles(unicode(toc_path))
-        on_modified.send(self,
-                         changes={'table_of_contents': self.table_of_contents})
+        self._send_changes(table_of_contents=self.table_of_contents)
+
+    def _page_from_dict(self, dikt):
+        """ Deserialize a single page from a dictionary.
+
+        :param dikt:    Serialized page, as produced by :py:meth:`Page.to_dict`
+        :type dikt:     dict
+        :rtype:         :py:class:`Page`
+        """
+        raw_image = self.path/dikt['raw_image']
+        if 'lineage' in dikt:
+            lineage = [ProcessingStep(plugin=s['plugin'],
+                                      path=self.path/s['path'],
+                                      timestamp=s['timestamp'],
+                                      is_image=s['is_image'],
+                                      input_checksum=s.get('input_checksum'),
+                                      config_fingerprint=s.get(
+                                          'config_fingerprint'))
+                       for s in dikt['lineage']]
+            missing = [s.path for s in lineage if not s.path.exists()]
+            lineage = [s for s in lineage if s.path not in missing]
+        else:
+            # Metadata from older versions has no lineage, so we have to
+            # reconstruct it from the modification times once
+            lineage, missing = [], []
+            for plugname, fpath in dikt['processed_images'].iteritems():
+                relpath = self.path/fpath
+                try:
+                    lineage.append(ProcessingStep(plugname, relpath,
+                                                  relpath.stat().st_mtime))
+                except OSError:
+                    missing.append(relpath)
+            lineage.sort(key=lambda s: s.timestamp)
+        for fpath in missing:
+            self._logger.warning(
+                "Could not find processed file {0}, removing from "
+                "workflow.".format(fpath))
+        processed_images = ProcessedImages.from_lineage(lineage)
+        return Page(raw_image=raw_image,
+                    capture_num=dikt['capture_num'],
+                    processed_images=processed_images,
+                    page_label=dikt['page_label'],
+                    sequence_num=dikt['sequence_num'])
 
     def _load_pages(self):
-        """ Load pages from ``pagemeta.json`` in bag.
+        """ Load pages from ``pagemeta.json`` in bag and replay all changes
+        from the page journal that have not yet been compacted into it.
 
         :returns:   Deserialized pages
         :rtype:     list of :py:class:`Page`
         """
-        def from_dict(dikt):
-            raw_image = self.path/dikt['raw_image']
-            processed_images = {}
-            for plugname, fpath in dikt['processed_images'].iteritems():
-                relpath = self.path/fpath
-                if relpath.exists():
-                    processed_images[plugname] = relpath
-                else:
-                    self._logger.warning(
-                        "Could not find processed file {0}, removing from "
-                        "workflow.")
-            return Page(raw_image=raw_image,
-                        capture_num=dikt['capture_num'],
-                        processed_images=processed_images,
-                        page_label=dikt['page_label'],
-                        sequence_num=dikt['sequence_num'])
         fpath = self.path / 'pagemeta.json'
-        if not fpath.exists():
-            return []
-        with fpath.open('r') as fp:
-            return sorted([from_dict(p) for p in json.load(fp)],
-                          key=lambda p: p.sequence_num)
+        if fpath.exists():
+            with fpath.open('r') as fp:
+                pages = sorted([self._page_from_dict(p)
+                                for p in json.load(fp)],
+                               key=lambda p: p.sequence_num)
+        else:
+            pages = []
+        journal_path = self.path / 'pagemeta.journal'
+        if journal_path.exists():
+            pages = self._replay_journal(pages, _read_journal(journal_path))
+        return pages
+
+    def _replay_journal(self, pages, records):
+        """ Apply page journal records to a list of pages.
+
+        Replaying is idempotent, i.e. records that were already compacted
+        into ``pagemeta.json`` (e.g. when the process was interrupted during
+        compaction) are skipped.
+
+        :param pages:   Pages as loaded from ``pagemeta.json``
+        :type pages:    list of :py:class:`Page`
+        :param records: Journal records in the order they were written
+        :type records:  list of dict
+        :returns:       The updated pages
+        :rtype:         list of :py:class:`Page`
+        """
+        # Temporarily bind the pages to the instance, since the renumbering
+        # logic operates on :py:attr:`pages`
+        self.pages = pages
+        by_capture_num = {p.capture_num: p for p in pages}
+        for record in records:
+            action = record['action']
+            if action == 'add':
+                capture_num = record['page']['capture_num']
+                if capture_num in by_capture_num:
+                    continue
+                page = self._page_from_dict(record['page'])
+                self.pages.append(page)
+                by_capture_num[capture_num] = page
+            elif action == 'update':
+                capture_num = record['page']['capture_num']
+                old_page = by_capture_num.get(capture_num)
+                if old_page is not None:
+                    page = self._page_from_dict(record['page'])
+                    self.pages[self.pages.index(old_page)] = page
+                    by_capture_num[capture_num] = page
+            elif action == 'remove':
+                to_remove = [by_capture_num.pop(num)
+                             for num in record['pages']
+                             if num in by_capture_num]
+                self._fix_page_numbers(to_remove)
+            else:
+                self._logger.warning(
+                    "Unknown action '{0}' in page journal, skipping."
+                    .format(action))
+        return sorted(self.pages, key=lambda p: p.sequence_num)
+
+    def _append_to_journal(self, *records):
+        """ Append one or more records to the page journal.
+
+        Instead of rewriting ``pagemeta.json`` on every change, page
+        mutations are appended to ``pagemeta.journal`` and only compacted
+        into ``pagemeta.json`` by :py:meth:`_save_pages`. The journal is not
+        part of the bag's tag files, so appending to it does not require
+        any re-hashing.
+
+        Supported records are ``{'action': 'add', 'page': <dict>}``,
+        ``{'action': 'update', 'page': <dict>}`` and
+        ``{'action': 'remove', 'pages': [<capture_num>, ...]}``.
+
+        :param records: Journal records
+        :type records:  dict
+        """
+        journal_path = self.path / 'pagemeta.journal'
+        data = b''.join(json.dumps(record, cls=util.CustomJSONEncoder,
+                                   ensure_ascii=False).encode('utf-8') + b'\n'
+                        for record in records)
+        with self._journal_lock, journal_path.open('ab') as fp:
+            fp.write(data)
 
     def _save_pages(self):
-        """ Write pages to ``pagemeta.json`` in bag. """
+        """ Compact pages into ``pagemeta.json`` in bag and clear the page
+        journal.
+        """
         fpath = self.path / 'pagemeta.json'
         with fpath.open('wb') as fp:
             json.dump([x.to_dict() for x in self.pages], fp,
                       cls=util.CustomJSONEncoder, indent=2, ensure_ascii=False)
-        self.bag.add_tagfiles(unicode(fpath))
-        on_modified.send(self, changes={'pages': self.pages})
+        with self.bag.batch():
+            self.bag.add_tagfiles(unicode(fpath))
+            # Store the page count in the bag info, so it can be read by
+            # :py:class:`WorkflowSummary` without loading all of the pages
+            page_count = unicode(len(self.pages))
+            if self.bag.info.get('spreads-page-count') != page_count:
+                self.bag.info['spreads-page-count'] = page_count
+        journal_path = self.path / 'pagemeta.journal'
+        with self._journal_lock:
+            if journal_path.exists():
+                journal_path.unlink()
+        self.bag.save_checksum_cache()
 
     def _run_hook(self, hook_name, *args):
         """ Run a specific hook method on all activated plugins.
@@ -807,13 +1905,369 @@ class Workflow(object):
                 step_progress=(step_progress + internal_progress))
 
         for (idx, plug) in enumerate(plugins):
-            # FIXME: This should really be disconnected once we're done here
-            plug.on_progressed.connect(
-                lambda s, **kwargs: update_progress(idx, kwargs['progress']),
-                sender=plug, weak=False)
-            getattr(plug, hook_name)(*args)
+            # Plugin instances are shared between workflows, so the receiver
+            # must only be connected while the hook is running
+            receiver = (lambda s, idx=idx, **kwargs:
+                        update_progress(idx, kwargs['progress']))
+            with plug.on_progressed.connected_to(receiver, sender=plug):
+                getattr(plug, hook_name)(*args)
             self._update_status(step_progress=float(idx+1)/len(plugins))
 
+    def _get_payload_checksum(self, path):
+        """ Get the checksum of a payload file from the bag's manifest.
+
+        :param path:    Path to the file
+        :type path:     :py:class:`pathlib.Path`
+        :returns:       The checksum or None if the file is not in the
+                        manifest
+        :rtype:         unicode
+        """
+        relpath = unicode(path.relative_to(self.path))
+        alg = 'md5' if 'md5' in self.bag.manifest_files else sorted(
+            self.bag.manifest_files)[0]
+        return self.bag.manifest_files[alg].get(relpath)
+
+    def _get_output_inputs(self, plug):
+        """ Describe everything the output of a plugin is generated from.
+
+        :param plug:    Output plugin
+        :type plug:     :py:class:`spreads.plugin.OutputHooksMixin`
+        :returns:       JSON-serializable description of the pages'
+                        checksums, a hash of the metadata and table of
+                        contents and the plugin's configuration fingerprint
+        :rtype:         dict
+        """
+        pages = []
+        for page in self.pages:
+            paths = [page.raw_image] + [s.path for s in page.lineage]
+            pages.append({
+                'sequence_num': page.sequence_num,
+                'page_label': page.page_label,
+                'checksums': {unicode(p.relative_to(self.path)):
+                              self._get_payload_checksum(p) for p in paths}})
+        metadata_hash = hashlib.md5(json.dumps(
+            {'metadata': dict(self.metadata),
+             'table_of_contents': self.table_of_contents},
+            cls=util.CustomJSONEncoder, sort_keys=True)).hexdigest()
+        return {
+            'pages': pages,
+            'metadata': metadata_hash,
+            'config': plugin.get_config_fingerprint(type(plug), self.config)}
+
+    def _output_is_current(self, manifest_path, inputs):
+        """ Check if the files recorded in an output manifest were generated
+        from the given inputs and are still present.
+
+        :param manifest_path:   Path to the output manifest
+        :type manifest_path:    :py:class:`pathlib.Path`
+        :param inputs:          Inputs as returned by
+                                :py:meth:`_get_output_inputs`
+        :type inputs:           dict
+        :rtype:                 bool
+        """
+        if not manifest_path.exists():
+            return False
+        with manifest_path.open('r', encoding='utf-8') as fp:
+            manifest = json.load(fp)
+        if manifest['inputs'] != inputs or not manifest['files']:
+            return False
+        return all((self.path/fname).exists() and
+                   self._get_payload_checksum(self.path/fname) == checksum
+                   for fname, checksum in manifest['files'].iteritems())
+
+    @staticmethod
+    def _get_file_signatures(path):
+        """ Get a signature for every file below a directory that changes
+        whenever the file is written to or replaced.
+
+        :param path:    Directory to scan recursively
+        :type path:     :py:class:`pathlib.Path`
+        :returns:       Mapping from file paths to their size, modification
+                        time and inode
+        :rtype:         dict
+        """
+        signatures = {}
+        for fpath in path.rglob('*'):
+            stat = fpath.stat()
+            if not S_ISREG(stat.st_mode):
+                continue
+            # Python 2 has no `st_mtime_ns`, the float timestamp still has
+            # sub-second resolution on all relevant filesystems
+            signatures[fpath] = (stat.st_size,
+                                 getattr(stat, 'st_mtime_ns', stat.st_mtime),
+                                 stat.st_ino)
+        return signatures
+
+    def _run_output_hooks(self, out_path, force=False):
+        """ Run all activated output plugins whose output is outdated.
+
+        Every plugin's output files are recorded in a manifest in the
+        ``output-manifests`` directory of the bag, together with the inputs
+        they were generated from. If the inputs did not change since, the
+        plugin is skipped.
+
+        :param out_path:    Target directory for output files
+        :type out_path:     :py:class:`pathlib.Path`
+        :param force:       Run all plugins, even if their output is current
+        :type force:        bool
+        """
+        self._logger.debug("Running 'output' hooks")
+        plugins = [x for x in self._plugins if hasattr(x, 'output')]
+        manifest_dir = self.path/'output-manifests'
+        # Make sure that all checksums are available
+        concfut.wait(self._pending_tasks)
+
+        def update_progress(idx, plug_progress):
+            """ Signal callback that updates the status and converts from
+                per-plugin progress to per-workflow progress. """
+            step_progress = float(idx) / len(plugins)
+            internal_progress = plug_progress * (1.0 / len(plugins))
+            self._update_status(
+                step_progress=(step_progress + internal_progress))
+
+        for (idx, plug) in enumerate(plugins):
+            manifest_path = manifest_dir/(plug.__name__ + '.json')
+            # Normalize the inputs to what they look like after a JSON
+            # round trip, so they can be compared with the manifest
+            inputs = json.loads(json.dumps(self._get_output_inputs(plug),
+                                           cls=util.CustomJSONEncoder))
+            if not force and self._output_is_current(manifest_path, inputs):
+                self._logger.info("Output of plugin '{0}' is up to date, "
+                                  "skipping.".format(plug.__name__))
+                self._update_status(step_progress=float(idx+1)/len(plugins))
+                continue
+            before = self._get_file_signatures(out_path)
+            receiver = (lambda s, idx=idx, **kwargs:
+                        update_progress(idx, kwargs['progress']))
+            with plug.on_progressed.connected_to(receiver, sender=plug):
+                plug.output(self.pages, out_path, self.metadata,
+                            self.table_of_contents)
+            produced = sorted(
+                path for path, signature
+                in self._get_file_signatures(out_path).iteritems()
+                if before.get(path) != signature)
+            with self.bag.batch():
+                if produced:
+                    self.bag.add_payload(*(unicode(p) for p in produced))
+                files = {unicode(path.relative_to(self.path)):
+                         self._get_payload_checksum(path)
+                         for path in produced}
+                if not manifest_dir.exists():
+                    manifest_dir.mkdir()
+                with manifest_path.open('wb') as fp:
+                    json.dump({'inputs': inputs, 'files': files}, fp,
+                              indent=2, ensure_ascii=False)
+                self.bag.add_tagfiles(unicode(manifest_path))
+            self._update_status(step_progress=float(idx+1)/len(plugins))
+
+    def _get_config_fingerprints(self, plugins):
+        """ Get a fingerprint of the configuration for every plugin in a
+        processing chain.
+
+        Every fingerprint covers the configuration of the plugin and of all
+        plugins before it, since a change upstream changes the plugin's
+        input.
+
+        :param plugins: Plugins in the order they are run in
+        :type plugins:  list of :py:class:`spreads.plugin.SpreadsPlugin`
+        :rtype:         list of unicode
+        """
+        fingerprints = []
+        chain = hashlib.md5()
+        for plug in plugins:
+            chain.update("{0}:{1};".format(
+                plug.__name__,
+                plugin.get_config_fingerprint(type(plug), self.config)))
+            fingerprints.append(chain.hexdigest())
+        return fingerprints
+
+    def _run_process_hooks(self, pages, target_path, force=False):
+        """ Run pages through all activated postprocessing plugins.
+
+        Consecutive plugins that implement
+        :py:meth:`spreads.plugin.ProcessHooksMixin.process_page` form a
+        pipeline, i.e. a page is handed on to the next plugin as soon as the
+        previous plugin is done with it. All other plugins are barriers, they
+        only start once all previous plugins are done with all pages.
+
+        Pages are only handed to the plugins that have not processed the
+        page's current raw image with their current configuration yet (see
+        :py:attr:`ProcessingStep.input_checksum` and
+        :py:attr:`ProcessingStep.config_fingerprint`).
+
+        Every time a plugin is done with a page, the page is checkpointed to
+        the page journal. When a run is interrupted, the next run thus
+        resumes with the pages and plugins that were not done yet.
+
+        :param pages:       Pages to process
+        :type pages:        list of :py:class:`Page`
+        :param target_path: Target directory for processed files
+        :type target_path:  :py:class:`pathlib.Path`
+        :param force:       Process all pages, even if they are up to date
+        :type force:        bool
+        """
+        self._logger.debug("Running 'process' hooks")
+        plugins = [x for x in self._plugins if hasattr(x, 'process')]
+        fingerprints = self._get_config_fingerprints(plugins)
+        plugin_indexes = {plug: idx for idx, plug in enumerate(plugins)}
+
+        # The checksums for recent captures might not be available yet
+        concfut.wait(self._pending_tasks)
+        checksums = {}
+        # Index of the first plugin that has to process a page
+        first_outdated = {}
+        for page in pages:
+            checksum = self._get_payload_checksum(page.raw_image)
+            checksums[page.capture_num] = checksum
+            up_to_date = [] if force or checksum is None else [
+                idx for idx, plug in enumerate(plugins)
+                if any(s.plugin == plug.__name__
+                       and s.input_checksum == checksum
+                       and s.config_fingerprint == fingerprints[idx]
+                       for s in page.lineage)]
+            # The fingerprints are chained, so a plugin being up to date
+            # means that all plugins before it are up to date as well
+            first_outdated[page.capture_num] = (max(up_to_date) + 1
+                                                if up_to_date else 0)
+            # Outdated results must not be used as input for other plugins
+            for plug in plugins[first_outdated[page.capture_num]:]:
+                page.processed_images.pop(plug.__name__, None)
+        num_skipped = sum(1 for idx in first_outdated.itervalues()
+                          if idx == len(plugins))
+        if num_skipped:
+            self._logger.info("Skipping {0} pages that are already processed"
+                              .format(num_skipped))
+
+        def needs_processing(plug, page):
+            return first_outdated[page.capture_num] <= plugin_indexes[plug]
+
+        def mark_processed(plug, page):
+            """ Record the input and configuration the plugin's output for
+                the page was produced from and checkpoint the page. """
+            step = next((s for s in page.lineage
+                         if s.plugin == plug.__name__), None)
+            if step is not None:
+                step.input_checksum = checksums[page.capture_num]
+                step.config_fingerprint = fingerprints[plugin_indexes[plug]]
+                self._append_to_journal({'action': 'update', 'page': page})
+
+        def process_page(plug, page):
+            if needs_processing(plug, page):
+                plug.process_page(page, target_path)
+                mark_processed(plug, page)
+
+        # Group plugins that support per-page processing into pipelines
+        stages = []
+        for plug in plugins:
+            if not plug.supports_page_processing():
+                stages.append(plug)
+            elif stages and isinstance(stages[-1], list):
+                stages[-1].append(plug)
+            else:
+                stages.append([plug])
+
+        num_done = 0
+        for stage in stages:
+            def update_progress(progress, num_done=num_done):
+                """ Convert from per-stage to per-workflow progress. """
+                self._update_status(
+                    step_progress=(num_done + progress)/len(plugins))
+            if isinstance(stage, list):
+                self._stream_pages(stage, pages, process_page,
+                                   lambda p: update_progress(p*len(stage)))
+                num_done += len(stage)
+            else:
+                outdated = [p for p in pages if needs_processing(stage, p)]
+                if outdated:
+                    receiver = (lambda s, **kwargs:
+                                update_progress(kwargs['progress']))
+                    with stage.on_progressed.connected_to(receiver,
+                                                          sender=stage):
+                        stage.process(outdated, target_path)
+                    for page in outdated:
+                        mark_processed(stage, page)
+                num_done += 1
+            self._update_status(step_progress=num_done/len(plugins))
+
+    def _stream_pages(self, plugins, pages, process_func, progress_callback):
+        """ Stream pages through a pipeline of plugins that support per-page
+        processing.
+
+        Every plugin gets as many worker threads as there are CPU cores.
+        Plugins are connected by bounded queues, so a slow plugin will hold
+        back the ones before it instead of piling up pages.
+
+        :param plugins:             Plugins to run the pages through, in
+                                    order
+        :type plugins:              list of
+            :py:class:`spreads.plugin.ProcessHooksMixin`
+        :param pages:               Pages to process
+        :type pages:                list of :py:class:`Page`
+        :param process_func:        Called with a plugin and a page to have
+                                    the plugin process the page
+        :type process_func:         callable
+        :param progress_callback:   Called with the combined progress of all
+                                    plugins, as a value between 0 and 1
+        :type progress_callback:    callable
+        """
+        if not pages:
+            return
+        num_workers = multiprocessing.cpu_count()
+        queues = [Queue.Queue(maxsize=2*num_workers) for _ in plugins]
+        num_processed = [0]*len(plugins)
+        num_running = [num_workers]*len(plugins)
+        errors = []
+        lock = threading.Lock()
+
+        def work(idx):
+            plug = plugins[idx]
+            in_queue = queues[idx]
+            out_queue = queues[idx+1] if idx+1 < len(queues) else None
+            while True:
+                page = in_queue.get()
+                if page is None:
+                    break
+                # After an error we keep draining the queues, so that no
+                # worker blocks forever
+                if not errors:
+                    try:
+                        process_func(plug, page)
+                    except Exception as exc:
+                        self._logger.error(
+                            "Plugin '{0}' failed to process page {1}"
+                            .format(plug.__name__, page.capture_num),
+                            exc_info=True)
+                        errors.append(exc)
+                with lock:
+                    num_processed[idx] += 1
+                    progress_callback(
+                        sum(num_processed)/(len(pages)*len(plugins)))
+                if out_queue is not None:
+                    out_queue.put(page)
+            with lock:
+                num_running[idx] -= 1
+                is_last = num_running[idx] == 0
+            # The last worker of a stage tells the next stage to shut down
+            if is_last and out_queue is not None:
+                for _ in xrange(num_workers):
+                    out_queue.put(None)
+
+        workers = []
+        for idx in xrange(len(plugins)):
+            for _ in xrange(num_workers):
+                thread = threading.Thread(target=work, args=(idx,))
+                thread.daemon = True
+                thread.start()
+                workers.append(thread)
+        for page in pages:
+            queues[0].put(page)
+        for _ in xrange(num_workers):
+            queues[0].put(None)
+        for thread in workers:
+            thread.join()
+        if errors:
+            raise errors[0]
+
     def _get_next_capture_page(self, target_page=None):
         """ Get next page that a capture should be stored as.
 
@@ -856,11 +2310,10 @@ class Workflow(object):
                 "Target page for at least one of the devices could not be"
                 "determined, please run 'spread configure' to configure your"
                 "devices.")
-        with concfut.ThreadPoolExecutor(len(self.devices)) as executor:
-            futures = []
-            self._logger.debug("Preparing capture in devices")
-            for dev in self.devices:
-                futures.append(executor.submit(dev.prepare_capture))
+        self._logger.debug("Preparing capture in devices")
+        futures = [util.executors.submit('device', dev.prepare_capture)
+                   for dev in self.devices]
+        concfut.wait(futures)
         util.check_futures_exceptions(futures)
 
         flip_target = ('flip_target_pages' in self.config['device'].keys()
@@ -898,14 +2351,20 @@ class Workflow(object):
 
             futures = []
             captured_pages = []
-            with concfut.ThreadPoolExecutor(
-                    num_devices if parallel_capture else 1) as executor:
-                self._logger.debug("Sending capture command to devices")
-                for dev in self.devices:
-                    page = self._get_next_capture_page(dev.target_page)
-                    captured_pages.append(page)
-                    futures.append(executor.submit(dev.capture,
-                                                   page.raw_image))
+            self._logger.debug("Sending capture command to devices")
+            for dev in self.devices:
+                page = self._get_next_capture_page(dev.target_page)
+                captured_pages.append(page)
+                if plugin.DeviceFeatures.CAN_CAPTURE_TO_STREAM in dev.features:
+                    futures.append(util.executors.submit(
+                        'device', self._capture_to_payload, dev,
+                        page.raw_image))
+                else:
+                    futures.append(util.executors.submit(
+                        'device', dev.capture, page.raw_image))
+                if not parallel_capture:
+                    concfut.wait(futures[-1:])
+            concfut.wait(futures)
             util.check_futures_exceptions(futures)
 
             if retake:
@@ -915,6 +2374,9 @@ class Workflow(object):
             for page in sorted(captured_pages, key=lambda p: p.capture_num):
                 page.sequence_num = len(self.pages)
                 self.pages.append(page)
+                self._index_page(page)
+            self._append_to_journal(*({'action': 'add', 'page': p}
+                                      for p in captured_pages))
             self._run_hook('capture', self.devices, self.path)
             # Queue new images for hashing
             future = self._threadpool.submit(self.bag.add_payload,
@@ -922,49 +2384,80 @@ class Workflow(object):
                                                for p in captured_pages))
             self._pending_tasks.append(future)
 
-        on_modified.send(self, changes={'pages': self.pages})
+        self._send_changes(pages_added=captured_pages)
         on_capture_succeeded.send(self, pages=captured_pages, retake=retake)
 
+    def _capture_to_payload(self, device, path):
+        """ Capture an image and write it to the bag's payload, so that it
+        is hashed while it is written.
+
+        :param device:  Device to capture the image with
+        :type device:   :py:class:`spreads.plugin.DeviceDriver`
+        :param path:    Path for the image
+        :type path:     :py:class:`pathlib.Path`
+        """
+        with self.bag.open_payload(unicode(path)) as fp:
+            device.capture_to_stream(fp)
+
     def finish_capture(self):
         """ Wrap up capture process. """
         # Waits for last capture to finish
         with self._capture_lock:
             concfut.wait(self._pending_tasks)
-        with concfut.ThreadPoolExecutor(len(self.devices)) as executor:
-            futures = []
-            self._logger.debug("Sending finish_capture command to devices")
-            for dev in self.devices:
-                futures.append(executor.submit(dev.finish_capture))
+        self._logger.debug("Sending finish_capture command to devices")
+        futures = [util.executors.submit('device', dev.finish_capture)
+                   for dev in self.devices]
+        concfut.wait(futures)
         util.check_futures_exceptions(futures)
-        # NOTE: For performance reason, we only save the pages here, since
-        # the ongoing hashing slows things down considerably during capture
+        # NOTE: For performance reason, we only compact the page journal
+        # here, since the ongoing hashing slows things down considerably
+        # during capture
         self._save_pages()
         self._run_hook('finish_capture', self.devices, self.path)
         self._run_hook('stop_trigger_loop')
         self._update_status(step=None, prepared=False)
 
-    def process(self):
-        """ Run all captured pages through post-processing. """
+    def process(self, force=False):
+        """ Run all captured pages through post-processing.
+
+        :param force:   Also process pages that have already been processed
+                        from the same raw image with the same configuration
+        :type force:    bool
+        """
         self._update_status(step='process', step_progress=0)
         self._logger.info("Starting postprocessing...")
         processed_path = self.path/'data'/'done'
         if not processed_path.exists():
             processed_path.mkdir()
-        self._run_hook('process', self.pages, processed_path)
-        self.bag.add_payload(unicode(processed_path))
-        self._save_pages()
+        before = self._get_file_signatures(processed_path)
+        self._run_process_hooks(self.pages, processed_path, force=force)
+        self._reindex_pages()
+        # Only files that were written during this run have to be hashed
+        payload = set(self.bag.payload)
+        produced = sorted(
+            path for path, signature
+            in self._get_file_signatures(processed_path).iteritems()
+            if before.get(path) != signature or unicode(path) not in payload)
+        with self.bag.batch():
+            self.bag.add_payload(*(unicode(p) for p in produced))
+            self._save_pages()
+        self._send_changes(pages_updated=self.pages)
         self._logger.info("Done with postprocessing!")
 
-    def output(self):
-        """ Assemble pages into output files. """
+    def output(self, force=False):
+        """ Assemble pages into output files.
+
+        :param force:   Also run output plugins whose output files were
+                        already generated from the current pages, metadata
+                        and configuration
+        :type force:    bool
+        """
         self._logger.info("Generating output files...")
         self._update_status(step='output', step_progress=0)
         out_path = self.path / 'data' / 'out'
         if not out_path.exists():
             out_path.mkdir()
-        self._run_hook('output', self.pages, out_path, self.metadata,
-                       self.table_of_contents)
-        self.bag.add_payload(str(out_path))
+        self._run_output_hooks(out_path, force=force)
         on_modified.send(self, changes={'out_files': self.out_files})
         self._logger.info("Done generating output files!")
 
@@ -976,4 +2469,6 @@ class Workflow(object):
         diff = util.diff_dicts(old_cfg, self.config.flatten())
         if 'device' in diff:
             self._run_hook('update_configuration', diff['device'])
+        # Plugins are instantiated with a snapshot of the configuration
+        self._plugin_instances = None
         on_modified.send(self, changes={'config': self.config.flatten()})
@@ -26,8 +26,9 @@ from __future__ import unicode_literals
 import logging
 import shutil
 
-from concurrent.futures import ProcessPoolExecutor
+import concurrent.futures as concfut
 
+import spreads.util as util
 from spreads.plugin import HookPlugin, ProcessHooksMixin
 
 logger = logging.getLogger('spreadsplug.autorotate')
@@ -135,6 +136,47 @@ class AutoRotatePlugin(HookPlugin, ProcessHooksMixin):
         return lambda x: page.processed_images.update(
             {self.__name__: out_path})
 
+    def _get_paths(self, page, target_path):
+        """ Get the input and output path for rotating a page's image.
+
+        :param page:        Page to be rotated
+        :type page:         :py:class:`spreads.workflow.Page`
+        :param target_path: Base directory where rotated images are to be
+                            stored
+        :type target_path:  :py:class:`pathlib.Path`
+        :returns:           Input and output path or None if the page should
+                            not be rotated
+        :rtype:             tuple of :py:class:`pathlib.Path`
+        """
+        in_path = page.get_latest_processed(image_only=True)
+        if self.__name__ in page.processed_images:
+            logger.info("Image was previously rotated already, skipping.")
+            return None
+        if in_path is None:
+            in_path = page.raw_image
+        if in_path.suffix.lower() not in ('.jpg', '.jpeg'):
+            logger.warn("Image {0} is not a JPG file, cannot be "
+                        "rotated".format(in_path))
+            return None
+        return in_path, target_path/(in_path.stem + "_rotated.jpg")
+
+    def process_page(self, page, target_path):
+        """ Rotate the most recent image of a single page according to its
+            EXIF orientation tag.
+
+        :param page:        Page to be processed
+        :type page:         :py:class:`spreads.workflow.Page`
+        :param target_path: Base directory where rotated images are to be
+                            stored
+        :type target_path:  :py:class:`pathlib.Path`
+        """
+        paths = self._get_paths(page, target_path)
+        if paths is None:
+            return
+        in_path, out_path = paths
+        autorotate_image(unicode(in_path), unicode(out_path))
+        page.processed_images[self.__name__] = out_path
+
     def process(self, pages, target_path):
         """ For each page, rotate the most recent image according to its EXIF
             orientation tag.
@@ -148,28 +190,21 @@ class AutoRotatePlugin(HookPlugin, ProcessHooksMixin):
         logger.info("Rotating images")
         futures = []
         # Distribute the work across all processor cores
-        with ProcessPoolExecutor() as executor:
-            num_total = len(pages)
-            for (idx, page) in enumerate(pages):
-                in_path = page.get_latest_processed(image_only=True)
-                if self.__name__ in page.processed_images:
-                    logger.info(
-                        "Image was previously rotated already, skipping.")
-                    continue
-                if in_path is None:
-                    in_path = page.raw_image
-                if in_path.suffix.lower() not in ('.jpg', '.jpeg'):
-                    logger.warn("Image {0} is not a JPG file, cannot be "
-                                "rotated".format(in_path))
-                    continue
-                out_path = target_path/(in_path.stem + "_rotated.jpg")
-                future = executor.submit(autorotate_image,
-                                         unicode(in_path),
-                                         unicode(out_path))
-                future.add_done_callback(
-                    self._get_progress_callback(idx, num_total)
-                )
-                future.add_done_callback(
-                    self._get_update_callback(page, out_path)
-                )
-                futures.append(future)
+        num_total = len(pages)
+        for (idx, page) in enumerate(pages):
+            paths = self._get_paths(page, target_path)
+            if paths is None:
+                continue
+            in_path, out_path = paths
+            future = util.executors.submit('image', autorotate_image,
+                                           unicode(in_path),
+                                           unicode(out_path))
+            future.add_done_callback(
+                self._get_progress_callback(idx, num_total)
+            )
+            future.add_done_callback(
+                self._get_update_callback(page, out_path)
+            )
+            futures.append(future)
+        concfut.wait(futures)
+        util.check_futures_exceptions(futures)
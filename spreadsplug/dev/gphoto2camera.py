@@ -12,7 +12,8 @@ class GPhoto2CameraDevice(DeviceDriver):
     """ Plugin for digital cameras communicating via raw PTP.
 
     """
-    features = (DeviceFeatures.PREVIEW, DeviceFeatures.IS_CAMERA)
+    features = (DeviceFeatures.PREVIEW, DeviceFeatures.IS_CAMERA,
+                DeviceFeatures.CAN_CAPTURE_TO_STREAM)
 
     target_page = None
 
@@ -98,6 +99,14 @@ class GPhoto2CameraDevice(DeviceDriver):
         return self._camera.get_preview()
 
     def capture(self, path):
+        self._capture_image().save(unicode(path))
+
+    def capture_to_stream(self, fp):
+        # The image is already in memory, so we can write it directly to
+        # the stream
+        fp.write(self._capture_image().as_blob())
+
+    def _capture_image(self):
         imgdata = self._camera.capture()
 
         # Set EXIF orientation
@@ -108,7 +117,7 @@ class GPhoto2CameraDevice(DeviceDriver):
             img.exif_orientation = 8 if upside_down else 6  # -90°
         else:
             img.exif_orientation = 6 if upside_down else 8  # 90°
-        img.save(unicode(path))
+        return img
 
     def update_configuration(self, updated):
         pass
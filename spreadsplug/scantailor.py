@@ -61,6 +61,14 @@ if not CLI_BIN:
 logger = logging.getLogger('spreadsplug.scantailor')
 
 
+def _is_enhanced(cli_bin):
+    """ Check if the installed ScanTailor is the 'enhanced' fork. """
+    help_out = util.get_subprocess([cli_bin],
+                                   stdout=subprocess.PIPE).communicate()[0]
+    return bool(re.match(r".*<images\|directory\|->.*",
+                         help_out.splitlines()[7]))
+
+
 class ScanTailorPlugin(HookPlugin, ProcessHooksMixin):
     __name__ = 'scantailor'
 
@@ -87,10 +95,8 @@ class ScanTailorPlugin(HookPlugin, ProcessHooksMixin):
 
     def __init__(self, config):
         super(ScanTailorPlugin, self).__init__(config)
-        help_out = util.get_subprocess([CLI_BIN],
-                                       stdout=subprocess.PIPE).communicate()[0]
-        self._enhanced = bool(re.match(r".*<images\|directory\|->.*",
-                              help_out.splitlines()[7]))
+        self._enhanced = util.get_cached_probe(CLI_BIN, 'enhanced',
+                                               _is_enhanced)
 
     def _generate_configuration(self, in_paths, projectfile, out_dir):
         """ Run images through ScanTailor pre-processing steps.
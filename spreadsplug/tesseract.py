@@ -121,6 +121,55 @@ class TesseractPlugin(HookPlugin, ProcessHooksMixin):
                 logger.warn("Could not find page for output file {0}"
                             .format(fname))
 
+    def process_page(self, page, target_path):
+        """ Perform OCR on the most recent image of a single page.
+
+        :param page:        Page to be processed
+        :type page:         :py:class:`spreads.workflow.Page`
+        :param target_path: Base directory where processed files are to be
+                            stored
+        :type target_path:  :py:class:`pathlib.Path`
+        """
+        in_path = page.get_latest_processed(image_only=True)
+        if in_path is None:
+            in_path = page.raw_image
+        out_dir = Path(tempfile.mkdtemp(prefix='tess-out'))
+        try:
+            language = self.config["language"].get()
+            with open(os.devnull, 'w') as devnull:
+                self._start_ocr(in_path, out_dir, language, devnull).wait()
+            fname = next(chain(out_dir.glob('*.hocr'),
+                               out_dir.glob('*.html')), None)
+            if fname is None:
+                logger.warn("Tesseract did not produce any output for {0}"
+                            .format(in_path))
+                return
+            self._perform_replacements(fname)
+            target_fname = target_path/fname.name
+            shutil.copyfile(unicode(fname), unicode(target_fname))
+            page.processed_images[self.__name__] = target_fname
+        finally:
+            shutil.rmtree(unicode(out_dir))
+
+    def _start_ocr(self, in_path, out_dir, language, devnull):
+        """ Launch tesseract for a single image.
+
+        :param in_path:     Input image
+        :type in_path:      :py:class:`pathlib.Path`
+        :param out_dir:     Output directory for the hOCR file
+        :type out_dir:      :py:class:`pathlib.Path`
+        :param language:    Language to use for OCRing
+        :type language:     unicode
+        :param devnull:     File to redirect the output of tesseract to
+        :type devnull:      file
+        :returns:           The tesseract process
+        :rtype:             :py:class:`subprocess.Popen`
+        """
+        cmd = [BIN, unicode(in_path), unicode(out_dir / in_path.stem),
+               "-l", language, "hocr"]
+        logger.debug(cmd)
+        return util.get_subprocess(cmd, stderr=devnull, stdout=devnull)
+
     def _perform_ocr(self, in_paths, out_dir, language):
         """ For each input image, launch tesseract and keep track of how far
             along the work is.
@@ -156,11 +205,8 @@ class TesseractPlugin(HookPlugin, ProcessHooksMixin):
             while len(processes) >= max_procs:
                 _clean_processes()
                 time.sleep(0.01)
-            cmd = [BIN, unicode(fpath), unicode(out_dir / fpath.stem),
-                   "-l", language, "hocr"]
-            logger.debug(cmd)
-            proc = util.get_subprocess(cmd, stderr=devnull, stdout=devnull)
-            processes.append(proc)
+            processes.append(self._start_ocr(fpath, out_dir, language,
+                                             devnull))
         # Wait for remaining processes to finish
         while processes:
             _clean_processes()
@@ -34,6 +34,7 @@ from tornado.web import FallbackHandler, Application
 
 import spreads.workflow
 import spreads.plugin as plugin
+from spreads.catalog import WorkflowCatalog
 from spreads.util import is_os
 from spreads.config import OptionTemplate
 from spreads.main import add_argument_from_template, should_show_argument
@@ -245,6 +246,12 @@ class WebApplication(object):
         task_queue = SqliteHuey(location=unicode(db_location))
         self.consumer = Consumer(task_queue)
 
+    def setup_catalog(self):
+        """ Configure the persistent workflow catalog. """
+        db_location = self.global_config.cfg_path.parent / 'catalog.db'
+        spreads.workflow.Workflow.set_catalog(
+            WorkflowCatalog(app.config['base_path'], db_location))
+
     def setup_logging(self):
         """ Configure loggers. """
         # Add in-memory log handler
@@ -311,6 +318,9 @@ class WebApplication(object):
             (r"/api/workflow/upload",
              handlers.StreamingUploadHandler,
              dict(base_path=app.config['base_path'])),
+            (r"/api/workflow/([0-9a-z-]+)/patch",
+             handlers.WorkflowPatchHandler,
+             dict(base_path=app.config['base_path'])),
             (r"/api/poll", handlers.EventLongPollingHandler),
             # Fall back to WSGI endpoints
             (r".*", FallbackHandler, dict(fallback=container))
@@ -334,6 +344,7 @@ class WebApplication(object):
         """ Run the web application. """
         self.setup_logging()
         self.setup_task_queue()
+        self.setup_catalog()
         self.setup_signals()
         self.setup_tornado()
 
@@ -160,6 +160,48 @@
         })
         .done(options.onSuccess || util.noop);
     },
+
+    /**
+     * Apply the changes from a 'workflow:changed' event to our pages.
+     * If we missed an event, the server was restarted or too many pages
+     * changed, all pages are fetched from the server instead.
+     */
+    applyChanges: function(data) {
+      if (data.resync || data.epoch !== this.get('epoch') ||
+          data.version !== this.get('version') + 1) {
+        this.resyncPages();
+        return;
+      }
+      var pages = _.indexBy(this.get('pages') || [], 'capture_num');
+      _.each(data.pages_removed, function(captureNum) {
+        delete pages[captureNum];
+      });
+      _.each(data.pages_updated.concat(data.pages_added), function(page) {
+        pages[page.capture_num] = page;
+      });
+      this.set({
+        pages: _.sortBy(_.values(pages), 'sequence_num'),
+        version: data.version
+      });
+    },
+
+    /**
+     * Fetch all pages and their version from the server.
+     */
+    resyncPages: function() {
+      jQuery.getJSON('/api/workflow/' + this.id + '/page')
+        .done(function(pages, status, xhr) {
+          var epoch = xhr.getResponseHeader('X-Workflow-Epoch'),
+              version = parseInt(xhr.getResponseHeader('X-Workflow-Version'), 10);
+          // Don't go back to an older state if newer events arrived
+          // meanwhile. Versions from another epoch can't be compared, the
+          // server's state always wins then.
+          if (epoch !== this.get('epoch') ||
+              version >= (this.get('version') || 0)) {
+            this.set({pages: pages, epoch: epoch, version: version});
+          }
+        }.bind(this));
+    },
   });
 
   module.exports = Backbone.Collection.extend({
@@ -211,6 +253,14 @@
         }
         this.sort();
       }, this);
+      eventDispatcher.on('workflow:changed', function(data) {
+        var workflow = this.get(data.senderId);
+        if (workflow) {
+          workflow.applyChanges(data);
+          workflow.set({last_modified: new Date().getTime() / 1000});
+        }
+        this.sort();
+      }, this);
     }
   });
 }());
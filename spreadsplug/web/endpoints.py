@@ -517,9 +517,15 @@ def create_workflow():
 def list_workflows():
     """ Return a list of all workflows.
 
+    :queryparam summary:    Only return lightweight summaries (id, slug,
+                            title, page count, status and time of last
+                            modification) instead of the full workflows
+    :type summary:          bool
+
     :resheader Content-Type:    :mimetype:`application/json`
     """
-    workflows = Workflow.find_all(app.config['base_path'])
+    summary = request.args.get('summary', 'false').lower() in ('true', '1')
+    workflows = Workflow.find_all(app.config['base_path'], summary=summary)
     return make_response(json.dumps(workflows.values()),
                          200, {'Content-Type': 'application/json'})
 
@@ -680,7 +686,7 @@ def submit_workflow(workflow):
     user_config = data.get('config', {})
     from tasks import upload_workflow
     upload_workflow(workflow.id, app.config['base_path'],
-                    'http://{0}/api/workflow/upload'.format(server),
+                    'http://{0}/api/workflow'.format(server),
                     user_config,
                     start_process=data.get('start_process', False),
                     start_output=data.get('start_output', False))
@@ -723,11 +729,10 @@ def inject_page(func):
         # through to the original function
         if 'workflow' not in kwargs and 'number' not in kwargs:
             return func(*args, **kwargs)
-        page = next((p for p in kwargs['workflow'].pages
-                    if p.capture_num == kwargs['number']), None)
+        page = kwargs['workflow'].find_page_by_capture_num(kwargs['number'])
         if not page:
             raise ApiException(
-                "Could not find page with capture number {1}"
+                "Could not find page with capture number {0}"
                 .format(kwargs['number']), 404)
         return func(*args, page=page, **kwargs)
     return view_func
@@ -784,14 +789,25 @@ def get_single_page(page, workflow):
 def get_all_pages(workflow):
     """ Get all pages for a workflow.
 
+    Clients that missed a :py:data:`spreads.workflow.on_changed` event use
+    this to resynchronize their list of pages.
+
     :param workflow:    UUID or slug for a workflow
     :type workflow:     str
 
-    :resheader Content-Type:    :mimetype:`application/json`
+    :resheader Content-Type:        :mimetype:`application/json`
+    :resheader X-Workflow-Epoch:    Epoch of the workflow the pages belong to
+    :resheader X-Workflow-Version:  Version of the workflow the pages
+                                    belong to
     """
-
+    # The version is read before the pages, so a change that happens in
+    # between is sent again as the next event, which clients can safely
+    # apply a second time
+    version = workflow.version
     return make_response(json.dumps(workflow.pages),
-                         200, {'Content-Type': 'application/json'})
+                         200, {'Content-Type': 'application/json',
+                               'X-Workflow-Epoch': workflow.epoch,
+                               'X-Workflow-Version': unicode(version)})
 
 
 @app.route('/api/workflow/<workflow:workflow>/page/<int:number>/<img_type>',
@@ -884,7 +900,6 @@ def delete_page(page, workflow):
 @inject_page
 def crop_workflow_image(page, workflow, img_type, plugname):
     """ Crop a page image in place. """
-    # TODO: We have to update the checksum!
     if img_type != 'raw':
         raise ApiException("Can only crop raw images.", 400)
     left = int(request.args.get('left', 0))
@@ -897,11 +912,45 @@ def crop_workflow_image(page, workflow, img_type, plugname):
     return 'OK'
 
 
+@app.route('/api/workflow/<workflow:workflow>/page/crop', methods=['POST'])
+def bulk_crop_pages(workflow):
+    """ Crop the raw images of multiple pages with one request.
+
+    The pages are cropped in the background, watch for
+    :py:data:`spreads.workflow.on_crop_progressed` to follow the progress.
+
+    :<json array pages:     Pages to crop, every page is an object with
+                            the page's ``capture_num`` and optionally the
+                            ``left``, ``top``, ``width`` and ``height`` of
+                            its crop box
+    :<json object box:      Crop box to use for pages that don't specify
+                            their own
+    """
+    data = json.loads(request.data)
+    default_box = data.get('box', {})
+    crops = []
+    for entry in data['pages']:
+        page = workflow.find_page_by_capture_num(entry['capture_num'])
+        if page is None:
+            raise ValidationError(pages="No page with capture number {0}"
+                                  .format(entry['capture_num']))
+        box = dict(default_box, **entry)
+        crops.append((page, (int(box.get('left', 0)), int(box.get('top', 0)),
+                             int(box.get('width', 0)) or None,
+                             int(box.get('height', 0)) or None)))
+    workflow.crop_pages(crops, async=True)
+    for page, _ in crops:
+        cache.delete("{0}.{1}.{2}".format(workflow.id, 'raw',
+                                          page.raw_image.name))
+    return 'OK'
+
+
 @app.route('/api/workflow/<workflow:workflow>/page', methods=['DELETE'])
 def bulk_delete_pages(workflow):
     """ Delete multiple pages from a workflow with one request. """
     cap_nums = [p['capture_num'] for p in json.loads(request.data)['pages']]
-    to_delete = [p for p in workflow.pages if p.capture_num in cap_nums]
+    to_delete = [workflow.find_page_by_capture_num(num) for num in cap_nums]
+    to_delete = [p for p in to_delete if p is not None]
     logger.debug("Bulk removing from workflow {0}: {1}".format(
         workflow.id, to_delete))
     workflow.remove_pages(*to_delete)
@@ -919,9 +968,13 @@ def prepare_capture(workflow):
     """ Prepare capture for the requested workflow. """
     # Check if any other workflow is active and finish, if neccessary
     logger.debug("Finishing previous workflows")
-    wfitems = Workflow.find_all(app.config['base_path'], key='id').iteritems()
-    for wfid, wf in wfitems:
-        if wf.status['step'] == 'capture' and wf.status['prepared']:
+    summaries = Workflow.find_all(app.config['base_path'], key='id',
+                                  summary=True).itervalues()
+    for summary in summaries:
+        # Only workflows that are already loaded can be in the capture step
+        status = summary.status
+        if status['step'] == 'capture' and status['prepared']:
+            wf = summary.workflow
             if wf is workflow and not request.args.get('reset'):
                 return 'OK'
             wf.finish_capture()
@@ -975,23 +1028,68 @@ def finish_capture(workflow):
 # ======================= #
 #  Postprocessing/Output  #
 # ======================= #
+@app.route('/api/workflow/<workflow:workflow>/manifest', methods=['POST'])
+@restrict_to_modes("processor", "full")
+def diff_workflow_manifests(workflow):
+    """ Compare the manifests of a submitted workflow with those of the
+    copy on this server.
+
+    This is the first step of re-submitting a workflow. Only the files
+    listed in the response have to be sent as a patch to
+    :py:class:`spreadsplug.web.handlers.WorkflowPatchHandler`.
+
+    :<json object manifests:        Payload manifests of the submitted
+                                    workflow, mapping checksum algorithms to
+                                    objects of paths and digests
+    :<json object tagmanifests:     Tag manifests of the submitted workflow,
+                                    in the same format
+    :>json array files:             Paths of all files that are missing or
+                                    different on this server, followed by
+                                    the manifests themselves
+
+    :status 200:        When the manifests were compared
+    :status 404:        When the workflow is not known to this server
+    """
+    data = json.loads(request.data)
+    manifests = data.get('manifests')
+    if not manifests:
+        raise ValidationError(manifests="required")
+    tagmanifests = data.get('tagmanifests', {})
+    files = workflow.bag.diff(manifests, tagmanifests)
+    files.extend("manifest-{0}.txt".format(alg) for alg in manifests)
+    files.extend("tagmanifest-{0}.txt".format(alg) for alg in tagmanifests)
+    return jsonify(files=files)
+
+
 @app.route('/api/workflow/<workflow:workflow>/process', methods=['POST'])
 @restrict_to_modes("processor", "full")
 def start_processing(workflow):
-    """ Enqueue the specified workflow for postprocessing. """
+    """ Enqueue the specified workflow for postprocessing.
+
+    :queryparam force:  Process all pages, even those that were already
+                        processed with the current configuration
+    :type force:        bool
+    """
+    force = request.args.get('force', 'false').lower() in ('true', '1')
     workflow._update_status(step='process', step_progress=None)
     from tasks import process_workflow
-    process_workflow(workflow.id, app.config['base_path'])
+    process_workflow(workflow.id, app.config['base_path'], force=force)
     return 'OK'
 
 
 @app.route('/api/workflow/<workflow:workflow>/output', methods=['POST'])
 @restrict_to_modes("processor", "full")
 def start_output_generation(workflow):
-    """ Enqueue the specified workflow for output generation. """
+    """ Enqueue the specified workflow for output generation.
+
+    :queryparam force:  Regenerate all output files, even those that are up
+                        to date
+    :type force:        bool
+    """
+    force = request.args.get('force', 'false').lower() in ('true', '1')
     workflow._update_status(step='output', step_progress=None)
     from tasks import output_workflow
-    output_workflow(workflow.id, app.config['base_path'])
+    output_workflow(workflow.id, app.config['base_path'], force=force)
     return 'OK'
 
 
@@ -19,13 +19,11 @@ import itertools
 import json
 import logging
 import os
+import shutil
 import uuid
-import tarfile
 import tempfile
 import threading
-import time
 import zipfile
-import Queue
 
 import blinker
 from tornado.ioloop import IOLoop
@@ -33,6 +31,8 @@ from tornado.web import RequestHandler, asynchronous, stream_request_body
 from tornado.websocket import WebSocketHandler as TornadoWebSocketHandler
 
 import util
+from spreads.util import SpreadsException, executors
+from spreads.vendor import bagit
 from spreads.workflow import Workflow
 
 signals = blinker.Namespace()
@@ -168,7 +168,7 @@ class StreamingUploadHandler(RequestHandler):
             zf.extractall(path=self.base_path)
         os.unlink(self.fname)
 
-        workflow = Workflow(path=os.path.join(self.base_path, wfname))
+        workflow = Workflow.reload(os.path.join(self.base_path, wfname))
         from spreads.workflow import on_created
         on_created.send(workflow, workflow=workflow)
 
@@ -176,183 +176,172 @@ class StreamingUploadHandler(RequestHandler):
         self.write(json.dumps(workflow, cls=util.CustomJSONEncoder))
 
 
-class ZipDownloadHandler(RequestHandler):
+@stream_request_body
+class WorkflowPatchHandler(RequestHandler):
+    """ Receives the files that changed in a re-submitted workflow as a ZIP
+    archive and patches the existing copy in place.
+
+    The archive has to contain the files listed by the
+    ``/api/workflow/<id>/manifest`` endpoint, including the manifests of
+    the submitted workflow.
+    """
     def initialize(self, base_path):
         self.base_path = base_path
 
-    @staticmethod
-    def calculate_zipsize(frecords):
-        """ Calculate size of resulting ZIP.
-
-        We can only safely pre-calculate this because we use no compression,
-        assume that we neither store empty directories and files bigger
-        than 4GiB.
-        Many thanks to 'flocki' from StackOverflow, who provided the underlying
-        formula: https://stackoverflow.com/a/19380600/487903
-        """
-        size = 0
-        for args, kwargs in frecords:
-            filename = args[0]
-            arcname = kwargs['arcname']
-            isdir = os.path.isdir(filename)
-            if arcname is None:
-                arcname = filename
-            arcname = os.path.normpath(os.path.splitdrive(arcname)[1])
-            while arcname[0] in (os.sep, os.altsep):
-                arcname = arcname[1:]
-            if isdir:
-                arcname += '/'
-            size += (2*len(arcname))  # Once in file header, once in EOCD
-            size += 30  # Fixed part of local file header
-            size += 16  # Data descriptor
-            size += 46  # Central file directory header
-            size += os.path.getsize(filename)
-        size += 22  # End of central directory record (EOCD)
-        return size
+    def prepare(self):
+        self.request.connection.set_max_body_size(2*1024**3)
+        fdesc, self.fname = tempfile.mkstemp()
+        self.fp = os.fdopen(fdesc, 'wb')
+
+    def data_received(self, chunk):
+        self.fp.write(chunk)
 
     @asynchronous
-    def get(self, workflow_id, filename):
-        uuid.UUID(workflow_id)
+    def post(self, workflow_id):
+        self.fp.close()
         workflow = Workflow.find_by_id(self.base_path, workflow_id)
-        zstream = workflow.bag.package_as_zipstream(compression=None)
-
-        self.set_status(200)
-        self.set_header('Content-type', 'application/zip')
-        self.set_header('Content-length',
-                        str(self.calculate_zipsize(zstream.paths_to_write)))
-
-        self.zstream_iter = iter(zstream)
-
-        self.send_next_chunk()
-
-    def send_next_chunk(self):
+        if workflow is None or workflow.is_busy:
+            os.unlink(self.fname)
+            self.send_error(404 if workflow is None else 409)
+            return
+        # Extracting, hashing and validating the patch takes a while, so
+        # it is done in the background
+        future = executors.submit('io', self.apply_patch, workflow)
+        IOLoop.current().add_future(future, self.on_patch_applied)
+
+    def apply_patch(self, workflow):
+        # Extract next to the workflow, so the files can be moved into the
+        # bag without copying them
+        tmp_dir = tempfile.mkdtemp(dir=unicode(workflow.path.parent))
+        patch_dir = os.path.join(tmp_dir, 'patch')
         try:
-            self.write(next(self.zstream_iter))
-            self.flush(callback=self.send_next_chunk)
-        except StopIteration:
-            self.finish()
-        on_download_finished.send()
-
-
-class QueueIO(object):
-    """ File-like object that writes to a queue.
-
-    Data can be read from another thread by iterating over the object.
-    Intended to be passed into tarfile.open as to allow streaming tar files
-    over the network without buffering them in RAM or on disk.
-    """
-    def __init__(self, handler):
-        # That's right, length 1, we want to save memory, after all...
-        self.queue = Queue.Queue(maxsize=1)
-        self.closed = False
-        self.last_read = None
-        self.read_time = None
-
-    def write(self, data):
-        while not self.closed:
-            # To achieve a balance between wasted CPU cycles (checking the
-            # queue) and decreased transfer speed (sleeping for too long),
-            # we wait at most the minimum time (plus a little extra) between
-            # two reads (see also: comment in `next`)
-            try:
-                self.queue.put(data, block=False)
-                return
-            except Queue.Full:
-                if self.read_time is not None:
-                    time.sleep(self.read_time*1.1)
-        raise ValueError("I/O operation on closed file")
+            with zipfile.ZipFile(self.fname) as zf:
+                for info in zf.infolist():
+                    # Strip the name of the workflow directory
+                    relpath = info.filename.split('/', 1)[-1]
+                    if relpath.startswith('/') or '..' in relpath.split('/'):
+                        raise bagit.BagError(
+                            "Invalid path in patch: {0}"
+                            .format(info.filename))
+                    target = os.path.join(patch_dir, *relpath.split('/'))
+                    if not os.path.exists(os.path.dirname(target)):
+                        os.makedirs(os.path.dirname(target))
+                    with open(target, 'wb') as fp:
+                        shutil.copyfileobj(zf.open(info), fp, 1024**2)
+            return Workflow.apply_patch(workflow, patch_dir)
+        finally:
+            shutil.rmtree(tmp_dir)
+            os.unlink(self.fname)
+
+    def on_patch_applied(self, future):
+        try:
+            workflow = future.result()
+        except SpreadsException:
+            self.send_error(409)
+            return
+        except bagit.ValidationError as e:
+            self.send_patch_error(e.message, e.details)
+            return
+        except (bagit.BagError, zipfile.BadZipfile) as e:
+            self.send_patch_error(unicode(e))
+            return
+        except Exception:
+            logging.error("Could not apply patch to workflow", exc_info=True)
+            self.send_error(500)
+            return
+        self.set_header('Content-Type', 'application/json')
+        self.finish(json.dumps(workflow, cls=util.CustomJSONEncoder))
 
-    def close(self):
-        self.closed = True
+    def send_patch_error(self, message, details=()):
+        self.set_status(400)
+        self.set_header('Content-Type', 'application/json')
+        self.finish(json.dumps({
+            'message': message,
+            'errors': [unicode(detail) for detail in details]}))
 
-    def __iter__(self):
-        return self
 
-    def next(self):
-        if self.closed and self.queue.empty():
-            raise StopIteration
-        if self.last_read is None:
-            self.last_read = time.time()
-        else:
-            # See if we have gotten any faster since the last read
-            read_time = time.time() - self.last_read
-            if self.read_time is None or self.read_time > read_time:
-                self.read_time = read_time
-            self.last_read += read_time
-        return self.queue.get()
+class ArchiveDownloadHandler(RequestHandler):
+    """ Base class for handlers that stream a workflow's bag as an archive.
 
+    Chunks are read from disk on the ``io`` lane of
+    :py:data:`spreads.util.executors` and written from the IOLoop. The next
+    chunk is only read once the previous one was handed to the socket, so
+    that no more than a single chunk is buffered, no matter how slow the
+    client is.
+    """
+    content_type = None
 
-class TarDownloadHandler(RequestHandler):
     def initialize(self, base_path):
         self.base_path = base_path
 
-    def create_tar(self, workflow, cb, exception_cb):
-        """ Intended to be run in a separate thread, since the call will block
-        until the whole workflow has been written out to the client or
-        the user cancels the transfer.
-        """
-        try:
-            workflow.bag.package_as_tarstream(self.fp)
-            IOLoop.instance().add_callback(cb)
-        except ValueError as e:
-            IOLoop.instance().add_callback(exception_cb, (e,))
-
-    def calculate_tarsize(self, workflow):
-        """ Similar to ZipDownloadHandler.calculate_zipsize, we can safely
-        pre-calculate the size of the resulting tar-file since we don't
-        compress and the resulting file is in the POSIX.1-1988 ustar format.
+    def make_stream(self, workflow):
+        """ Create the archive stream for a workflow.
+
+        :param workflow:    Workflow to package
+        :type workflow:     :py:class:`spreads.workflow.Workflow`
+        :rtype:             :py:class:`spreads.vendor.bagit.ArchiveStream`
         """
-        # top-level directory block
-        size = tarfile.BLOCKSIZE
-        for path in workflow.path.glob('**/*'):
-            # file header
-            size += tarfile.BLOCKSIZE
-            # file size rounded up to next multiple of 512
-            if not path.is_dir():
-                size += ((path.stat().st_size/512)+1)*512
-        # empty end-of-file blocks
-        size += 2*tarfile.BLOCKSIZE
-        # fill up until the size is a multiple of tarfile.RECORDSIZE
-        blocks, remainder = divmod(size, tarfile.RECORDSIZE)
-        if remainder > 0:
-            size += (tarfile.RECORDSIZE - remainder)
-        return size
+        raise NotImplementedError
 
     @asynchronous
     def get(self, workflow_id, filename):
         uuid.UUID(workflow_id)
         workflow = Workflow.find_by_id(self.base_path, workflow_id)
+        stream = self.make_stream(workflow)
 
         self.set_status(200)
-        self.set_header('Content-type', 'application/tar')
-        self.set_header('Content-length', self.calculate_tarsize(workflow))
-
-        self.fp = QueueIO(self)
-        self.thread = threading.Thread(
-            target=self.create_tar,
-            args=(workflow, self.on_done, self.on_exception)
-        )
-        self.thread.start()
-        self.send_next_chunk()
-
-    def send_next_chunk(self):
+        self.set_header('Content-type', self.content_type)
+        self.set_header('Content-length', str(stream.size))
+
+        self.stream_iter = iter(stream)
+        self.reading = False
+        self.closed = False
+        self.read_next_chunk()
+
+    def read_next_chunk(self):
+        self.reading = True
+        future = executors.submit('io', next, self.stream_iter, None)
+        IOLoop.current().add_future(future, self.send_chunk)
+
+    def send_chunk(self, future):
+        self.reading = False
+        if self.closed:
+            # The connection was closed while the chunk was being read
+            self.stream_iter.close()
+            return
         try:
-            self.write(next(self.fp))
-            self.flush(callback=self.send_next_chunk)
-        except StopIteration:
+            chunk = future.result()
+        except Exception:
+            logging.error("Could not read archive chunk", exc_info=True)
+            self.stream_iter.close()
+            self.request.connection.close()
+            return
+        if chunk is None:
             self.finish()
-
-    def on_done(self):
-        self.fp.close()
-
-    def on_exception(self, exc):
-        skip = (isinstance(exc[0], ValueError)
-                and "closed file" in exc[0].message)
-        if not skip:
-            raise exc
+            return
+        self.write(chunk)
+        self.flush(callback=self.read_next_chunk)
 
     def on_finish(self):
         on_download_finished.send()
 
     def on_connection_close(self):
-        self.fp.close()
+        # Closes the file that is currently being read. While a chunk is
+        # being read, the iterator can only be closed once it arrives.
+        self.closed = True
+        if not self.reading:
+            self.stream_iter.close()
+
+
+class ZipDownloadHandler(ArchiveDownloadHandler):
+    content_type = 'application/zip'
+
+    def make_stream(self, workflow):
+        return workflow.bag.package_as_zipstream()
+
+
+class TarDownloadHandler(ArchiveDownloadHandler):
+    content_type = 'application/tar'
+
+    def make_stream(self, workflow):
+        return workflow.bag.package_as_tarstream()
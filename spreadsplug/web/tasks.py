@@ -18,6 +18,7 @@
 from __future__ import division
 
 import copy
+import json
 import logging
 import shutil
 
@@ -94,12 +95,39 @@ def transfer_to_stick(wf_id, base_path):
         workflow.status['step'] = None
 
 
+def _get_changed_files(workflow, endpoint):
+    """ Ask the postprocessing server which files of the workflow it lacks.
+
+    :returns:   Relative paths of the files to send or None if the server
+                does not know the workflow yet
+    :rtype:     list of unicode
+    """
+    bag = workflow.bag
+    manifests = {
+        'manifests': dict((alg, dict(manifest)) for alg, manifest
+                          in bag.manifest_files.iteritems()),
+        'tagmanifests': dict((alg, dict(manifest)) for alg, manifest
+                             in bag.tagmanifest_files.iteritems())}
+    resp = requests.post(endpoint + "/{0}/manifest".format(workflow.id),
+                         data=json.dumps(manifests),
+                         headers={'Content-Type': 'application/json'})
+    # Servers that don't know the workflow or are too old to sync it
+    # get the complete workflow
+    if resp.status_code in (404, 405):
+        return None
+    resp.raise_for_status()
+    return resp.json()['files']
+
+
 @task_queue.task()
 def upload_workflow(wf_id, base_path, endpoint, user_config,
                     start_process=False, start_output=False):
     logger.debug("Uploading workflow to postprocessing server")
 
     workflow = Workflow.find_by_id(base_path, wf_id)
+    # Compact the page journal into the bag, since the journal itself is
+    # not sent to the server
+    workflow.compact()
     # NOTE: This is kind of nasty.... We temporarily write the user-supplied
     # configuration to the bag, update the tag-payload, create the zip, and
     # once everything is done, we restore the old version
@@ -110,10 +138,28 @@ def upload_workflow(wf_id, base_path, endpoint, user_config,
                  sections=(user_config['plugins'] + ["plugins", "device"]))
     workflow.bag.add_tagfiles(unicode(tmp_cfg_path))
 
-    # Create a zipstream from the workflow-bag
-    zstream = workflow.bag.package_as_zipstream(compression=None)
-    zstream_copy = copy.deepcopy(zstream)
-    zsize = sum(len(x) for x in zstream_copy)
+    try:
+        changed_files = _get_changed_files(workflow, endpoint)
+    except requests.RequestException as e:
+        error_msg = "Upload failed: {0}".format(e)
+        signals['submit:error'].send(workflow, message=error_msg, data=None)
+        logger.error(error_msg)
+        workflow._save_config()
+        return
+
+    # Create a zipstream from the workflow-bag, its size is planned from the
+    # file stats, so every file is only read once, during the upload.
+    # If the server already has the workflow, only the files it lacks are
+    # sent and patched into its copy.
+    if changed_files is None:
+        zstream = workflow.bag.package_as_zipstream()
+        upload_url = endpoint + "/upload"
+    else:
+        logger.debug("Sending {0} changed files to postprocessing server"
+                     .format(len(changed_files)))
+        zstream = workflow.bag.package_as_zipstream(include=changed_files)
+        upload_url = endpoint + "/{0}/patch".format(workflow.id)
+    zsize = zstream.size
 
     def zstream_wrapper():
         """ Wrapper around our zstream so we can emit a signal when all data
@@ -139,7 +185,7 @@ def upload_workflow(wf_id, base_path, endpoint, user_config,
     #       known size.
     zstream_fp = GeneratorIO(zstream_wrapper(), zsize)
     signals['submit:started'].send(workflow)
-    resp = requests.post(endpoint, data=zstream_fp,
+    resp = requests.post(upload_url, data=zstream_fp,
                          headers={'Content-Type': 'application/zip'})
     if not resp:
         error_msg = "Upload failed: {0}".format(resp.content)
@@ -159,16 +205,16 @@ def upload_workflow(wf_id, base_path, endpoint, user_config,
 
 
 @task_queue.task()
-def process_workflow(wf_id, base_path):
+def process_workflow(wf_id, base_path, force=False):
     workflow = Workflow.find_by_id(base_path, wf_id)
     logger.debug("Initiating processing for workflow {0}"
                  .format(workflow.slug))
-    workflow.process()
+    workflow.process(force=force)
 
 
 @task_queue.task()
-def output_workflow(wf_id, base_path):
+def output_workflow(wf_id, base_path, force=False):
     workflow = Workflow.find_by_id(base_path, wf_id)
     logger.debug("Initiating output generation for workflow {0}"
                  .format(workflow.slug))
-    workflow.output()
+    workflow.output(force=force)
@@ -88,6 +88,8 @@ class CustomJSONEncoder(JSONEncoder):
             'metadata': dict(workflow.metadata),
             'status': workflow.status,
             'last_modified': workflow.last_modified,
+            'epoch': workflow.epoch,
+            'version': workflow.version,
             'pages': workflow.pages,
             'out_files': [{'name': path.name,
                            'mimetype': path}
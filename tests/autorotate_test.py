@@ -1,6 +1,7 @@
 import mock
 import shutil
 
+from concurrent.futures import Future
 from spreads.vendor.pathlib import Path
 
 import spreadsplug.autorotate as autorotate
@@ -18,16 +19,21 @@ def test_process():
     pages = [Page(Path('{0:03}.jpg'.format(idx))) for idx in xrange(4)]
     target_path = Path('/tmp/dummy')
 
-    with mock.patch('spreadsplug.autorotate.ProcessPoolExecutor') as mockctx:
+    def submit(*args, **kwargs):
+        future = Future()
+        future.set_result(None)
+        return future
+
+    with mock.patch('spreads.util.executors') as executors:
+        executors.submit.side_effect = submit
         plugin = autorotate.AutoRotatePlugin(config)
-        pool = mockctx.return_value.__enter__.return_value
         plugin.process(pages, target_path)
         # The text file should not have been passed
-        assert pool.submit.call_count == 4
-        # We only want the second parameter to submit, the first is the
-        # function to call
+        assert executors.submit.call_count == 4
+        # We only want the third parameter to submit, the first two are the
+        # lane and the function to call
         assert sorted([unicode(p.raw_image) for p in pages]) == (
-            sorted(x[0][1] for x in pool.submit.call_args_list))
+            sorted(x[0][2] for x in executors.submit.call_args_list))
 
 
 def test_autorotate_image(tmpdir):
@@ -0,0 +1,280 @@
+from __future__ import division, unicode_literals
+
+import io
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+import zipfile
+
+import concurrent.futures
+import mock
+import pytest
+
+import spreads.util as util
+import spreads.workflow
+from spreads.plugin import DeviceFeatures
+from spreads.vendor import bagit
+
+
+@pytest.fixture
+def workflow(config, tmpdir):
+    return spreads.workflow.Workflow(config=config, path=unicode(tmpdir))
+
+
+@pytest.fixture
+def captured(workflow):
+    """ Workflow whose bag contains two captured spreads. """
+    workflow.config['device']['parallel_capture'] = True
+    workflow.prepare_capture()
+    for _ in xrange(2):
+        workflow.capture()
+    workflow.finish_capture()
+    return workflow
+
+
+def test_bag_batch(workflow):
+    manifest_path = workflow.path/'manifest-md5.txt'
+    raw_path = workflow.path/'data'/'raw'
+    raw_path.mkdir()
+    paths = []
+    for idx in xrange(3):
+        path = raw_path/'{0:03}.jpg'.format(idx)
+        with path.open('wb') as fp:
+            fp.write(b'page {0}'.format(idx))
+        paths.append(unicode(path))
+    with workflow.bag.batch():
+        for path in paths:
+            workflow.bag.add_payload(path)
+        # Nothing is written before the batch is done
+        assert manifest_path.open().read() == ''
+    assert len(manifest_path.open().readlines()) == 3
+    assert workflow.bag.info['payload-oxum'].endswith('.3')
+    workflow.bag.validate()
+
+
+def test_bag_hashing_service(captured):
+    service = captured.bag._hashing_service
+    assert service is spreads.workflow.Workflow._hashing_service
+    # Bags hash on the shared lane, not on a pool of their own
+    assert bagit.shared_hashing_service._executor is None
+    assert len(captured.bag.payload) == 4
+
+    # Hashing from tasks that occupy the whole lane must not deadlock
+    futures = [util.executors.submit('hashing', service.map,
+                                     captured.bag.payload, ['md5'])
+               for _ in xrange(4)]
+    for future in futures:
+        assert len(future.result(timeout=10)) == 4
+
+
+def test_bag_payload_index(workflow):
+    raw_path = workflow.path/'data'/'raw'
+    raw_path.mkdir()
+    paths = []
+    for idx in xrange(3):
+        path = raw_path/'{0:03}.jpg'.format(idx)
+        with path.open('wb') as fp:
+            fp.write(b'x'*(idx+1))
+        paths.append(unicode(path))
+    workflow.bag.add_payload(*reversed(paths))
+    assert workflow.bag.payload == tuple(paths)
+    assert workflow.bag.info['payload-oxum'] == '6.3'
+
+    # Updating a file only changes its size
+    with open(paths[0], 'ab') as fp:
+        fp.write(b'xxx')
+    workflow.bag.add_payload(paths[0])
+    assert workflow.bag.info['payload-oxum'] == '9.3'
+
+    workflow.bag.remove_payload(paths[1])
+    assert workflow.bag.payload == (paths[0], paths[2])
+    assert workflow.bag.info['payload-oxum'] == '7.2'
+    workflow.bag.validate()
+
+
+def test_bag_checksum_cache(captured):
+    assert (captured.path/bagit.CHECKSUM_CACHE_FNAME).exists()
+
+    with mock.patch('spreads.vendor.bagit.hash_file',
+                    side_effect=bagit.hash_file) as hash_file:
+        captured.bag.validate()
+        assert not hash_file.called
+        captured.bag.validate(paranoid=True)
+        assert hash_file.call_count == len(captured.bag.payload +
+                                           captured.bag.tagfiles)
+
+    # Changed files are hashed again
+    page = captured.pages[0]
+    with page.raw_image.open('ab') as fp:
+        fp.write(b'changed')
+    with pytest.raises(bagit.ValidationError):
+        captured.bag.validate()
+
+
+def test_bag_checksum_cache_deferred(workflow):
+    cache_path = workflow.path/bagit.CHECKSUM_CACHE_FNAME
+    workflow.prepare_capture()
+    for _ in xrange(2):
+        workflow.capture()
+    concurrent.futures.wait(workflow._pending_tasks)
+    # The cache is not rewritten for every shot
+    assert not cache_path.exists()
+    workflow.finish_capture()
+    assert sorted(json.loads(cache_path.open().read())) == sorted(
+        workflow.bag._get_relative_path(p) for p in workflow.bag.payload +
+        workflow.bag.tagfiles)
+
+
+def test_bag_fast_validation(captured):
+    payload = captured.bag.payload
+    oxum = captured.bag.info['payload-oxum']
+
+    # A reopened bag knows the sizes from the checksum cache
+    bag = bagit.Bag(unicode(captured.path), checksum_cache=True)
+    size = os.path.getsize(payload[0])
+    with mock.patch('os.stat', side_effect=os.stat) as stat:
+        bag.remove_payload(payload[0])
+        assert not any(call[0][0] in payload[1:]
+                       for call in stat.call_args_list)
+    assert bag.info['payload-oxum'] == "{0}.{1}".format(
+        int(oxum.split('.')[0]) - size, len(payload) - 1)
+
+    # Pretend the payload was last modified a while ago
+    for root, _, _ in os.walk(bag._get_path('data')):
+        os.utime(root, (time.time() - 60,)*2)
+    bag.validate(fast=True)
+    with mock.patch.object(bagit.BagValidator, '_validate_oxum') as validate:
+        bag.validate(fast=True)
+        assert not validate.called
+
+    # Added files change the stats of their directory
+    with open(bag._get_path('data/unexpected.txt'), 'wb') as fp:
+        fp.write(b'foo')
+    with pytest.raises(bagit.ValidationError):
+        bag.validate(fast=True)
+
+
+def test_bag_tarstream(captured):
+    tstream = captured.bag.package_as_tarstream()
+    tstream.block_size = 4096
+    data = b''.join(tstream)
+    assert len(data) == tstream.size
+    with tarfile.open(fileobj=io.BytesIO(data)) as tf:
+        names = tf.getnames()
+        raw_path = captured.pages[0].raw_image
+        member = "/".join([captured.path.name, 'data', 'raw', raw_path.name])
+        with raw_path.open('rb') as fp:
+            assert tf.extractfile(member).read() == fp.read()
+    assert 'checksum-cache.json' not in (n.split('/')[-1] for n in names)
+
+    # Unchanged bags are packaged without walking the directory again
+    for root, _, _ in os.walk(unicode(captured.path)):
+        os.utime(root, (time.time() - 60,)*2)
+    for fpath in captured.path.iterdir():
+        os.utime(unicode(fpath), (time.time() - 60,)*2)
+    captured.bag.package_as_tarstream()
+    with mock.patch('os.walk') as walk:
+        assert captured.bag.package_as_tarstream().size == tstream.size
+        assert not walk.called
+
+
+def test_bag_zipstream(captured):
+    zstream = captured.bag.package_as_zipstream()
+    with mock.patch('io.open') as open_:
+        # Planning the archive does not read any of the files
+        planned = captured.bag.package_as_zipstream()
+        assert not open_.called
+    data = b''.join(zstream)
+    assert len(data) == zstream.size == planned.size
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == list(zstream.offsets)
+        raw_path = captured.pages[0].raw_image
+        member = "/".join([captured.path.name, 'data', 'raw', raw_path.name])
+        assert zf.getinfo(member).header_offset == zstream.offsets[member]
+        with raw_path.open('rb') as fp:
+            assert zf.read(member) == fp.read()
+
+
+def test_bag_patch(captured):
+    copy_dir = tempfile.mkdtemp()
+    copy_path = os.path.join(copy_dir, captured.path.name)
+    shutil.copytree(unicode(captured.path), copy_path)
+
+    # Retake the last pages
+    captured.prepare_capture()
+    captured.capture(retake=True)
+    captured.finish_capture()
+    first_page = captured.pages[0]
+    captured.remove_pages(first_page)
+
+    copy = bagit.Bag(copy_path, checksum_cache=True)
+    files = copy.diff(
+        dict((alg, dict(m)) for alg, m in captured.bag.manifest_files.items()),
+        dict((alg, dict(m))
+             for alg, m in captured.bag.tagmanifest_files.items()))
+    raw_paths = [os.path.join('data', 'raw', p.raw_image.name)
+                 for p in captured.pages]
+    assert raw_paths[-1] in files
+    assert raw_paths[0] not in files
+    assert 'bag-info.txt' in files
+
+    zstream = captured.bag.package_as_zipstream(
+        include=files + ['manifest-md5.txt', 'tagmanifest-md5.txt'])
+    patch_dir = os.path.join(copy_dir, 'patch')
+    with zipfile.ZipFile(io.BytesIO(b''.join(zstream))) as zf:
+        for name in zf.namelist():
+            # Strip the name of the workflow directory
+            target = os.path.join(patch_dir, *name.split('/')[1:])
+            if not os.path.exists(os.path.dirname(target)):
+                os.makedirs(os.path.dirname(target))
+            with open(target, 'wb') as fp:
+                fp.write(zf.read(name))
+    copy.apply_patch(patch_dir)
+    copy.validate()
+    assert (dict(copy.manifest_files['md5']) ==
+            dict(captured.bag.manifest_files['md5']))
+    assert not os.path.exists(os.path.join(
+        copy_path, 'data', 'raw', first_page.raw_image.name))
+    shutil.rmtree(copy_dir)
+
+
+def test_checksum_algorithms(config, tmpdir):
+    config['checksum_algorithms'] = ['md5', 'sha256']
+    workflow = spreads.workflow.Workflow(config=config,
+                                         path=unicode(tmpdir.join('wf')))
+    workflow.prepare_capture()
+    workflow.capture()
+    workflow.finish_capture()
+    assert sorted(workflow.bag.manifest_files) == ['md5', 'sha256']
+    workflow.bag.validate(paranoid=True)
+
+    # The digests don't depend on the size of the read buffer
+    fpath = unicode(workflow.pages[0].raw_image)
+    _, checksums, size = bagit.hash_file(fpath, ['md5', 'sha256'])
+    assert bagit.hash_file(fpath, ['md5', 'sha256'],
+                           buffer_size=1000) == (fpath, checksums, size)
+    assert (checksums['sha256'] ==
+            workflow.bag.manifest_files['sha256'][
+                workflow.bag._get_relative_path(fpath)])
+
+
+def test_capture_to_stream(workflow):
+    workflow.config['device']['parallel_capture'] = True
+    for dev in workflow.devices:
+        dev.features = (DeviceFeatures.IS_CAMERA,
+                        DeviceFeatures.CAN_CAPTURE_TO_STREAM)
+    workflow.prepare_capture()
+    with mock.patch('spreads.vendor.bagit.hash_file',
+                    side_effect=bagit.hash_file) as hash_file:
+        workflow.capture()
+        workflow.finish_capture()
+    # Only the tag files had to be read for hashing
+    assert not any(unicode(p.raw_image) == call[0][0]
+                   for p in workflow.pages
+                   for call in hash_file.call_args_list)
+    assert len(workflow.bag.payload) == 2
+    workflow.bag.validate(paranoid=True)
@@ -0,0 +1,96 @@
+from __future__ import unicode_literals
+
+import time
+
+import mock
+import pytest
+
+import spreads.workflow
+from spreads.catalog import WorkflowCatalog
+
+
+@pytest.yield_fixture
+def catalog(tmpdir):
+    location = tmpdir.join('workflows')
+    location.mkdir()
+    catalog = WorkflowCatalog(unicode(location),
+                              unicode(tmpdir.join('catalog.db')))
+    spreads.workflow.Workflow.set_catalog(catalog)
+    yield catalog
+    spreads.workflow.Workflow._catalogs.clear()
+    spreads.workflow.Workflow._cache.clear()
+
+
+def create_workflow(catalog, config, title):
+    return spreads.workflow.Workflow.create(
+        catalog.location, metadata={'title': title}, config=config)
+
+
+def test_find(catalog, config):
+    workflow = create_workflow(catalog, config, 'First Workflow')
+    summary = catalog.find('id', workflow.id)
+    assert summary.slug == 'first-workflow'
+    assert summary.title == 'First Workflow'
+    assert summary.page_count == 0
+    assert catalog.find('slug', 'first-workflow').id == workflow.id
+    assert catalog.find('slug', 'missing') is None
+
+
+def test_detects_changes(catalog, config):
+    workflow = create_workflow(catalog, config, 'First Workflow')
+    assert len(catalog.summaries()) == 1
+    create_workflow(catalog, config, 'Second Workflow')
+    assert len(catalog.summaries()) == 2
+
+    workflow.metadata = {'title': 'Renamed Workflow'}
+    assert catalog.find('id', workflow.id).title == 'Renamed Workflow'
+
+    spreads.workflow.Workflow.remove(workflow)
+    assert catalog.find('id', workflow.id) is None
+    assert len(catalog.summaries()) == 1
+
+
+def test_find_missing(catalog, config):
+    workflow = create_workflow(catalog, config, 'First Workflow')
+    catalog.refresh()
+    with mock.patch.object(catalog, '_check_entry') as check_entry:
+        # Ids don't change, so missing ones are not searched for
+        assert catalog.find('id', 'missing') is None
+        assert catalog.find('slug', 'missing') is None
+        assert check_entry.call_count == 1
+        # Missing slugs only check all entries once per interval
+        assert catalog.find('slug', 'missing') is None
+        assert check_entry.call_count == 1
+
+    workflow.slug = 'renamed-workflow'
+    assert catalog.find('slug', 'renamed-workflow') is None
+    catalog._last_forced_refresh -= catalog.FORCED_REFRESH_INTERVAL
+    assert catalog.find('slug', 'renamed-workflow').id == workflow.id
+
+
+def test_fingerprint_sha256_only(catalog, config):
+    config['checksum_algorithms'] = ['sha256']
+    workflow = create_workflow(catalog, config, 'First Workflow')
+    fingerprint = WorkflowCatalog._get_fingerprint(workflow.path)
+    time.sleep(0.01)
+    # Only changes the tag manifest
+    workflow.save()
+    assert WorkflowCatalog._get_fingerprint(workflow.path) != fingerprint
+
+
+def test_persistence(catalog, config, tmpdir):
+    workflow = create_workflow(catalog, config, 'First Workflow')
+    catalog.refresh()
+    reopened = WorkflowCatalog(catalog.location, catalog.db_path)
+    assert reopened.find('id', workflow.id).path == workflow.path
+
+
+def test_find_by_id(catalog, config):
+    workflow = create_workflow(catalog, config, 'First Workflow')
+    spreads.workflow.Workflow._cache.clear()
+    loaded = spreads.workflow.Workflow.find_by_id(catalog.location,
+                                                  workflow.id)
+    assert loaded.path == workflow.path
+    assert (spreads.workflow.Workflow.find_by_slug(catalog.location,
+                                                   'first-workflow')
+            is loaded)
@@ -123,6 +123,13 @@ class TestDriver(plugin.DeviceDriver):
         )
         shutil.copyfile(srcpath, unicode(path))
 
+    def capture_to_stream(self, fp):
+        srcpath = os.path.abspath(
+            './tests/data/{0}.jpg'.format(self.target_page or 'even')
+        )
+        with open(srcpath, 'rb') as src:
+            shutil.copyfileobj(src, fp)
+
     def finish_capture(self):
         pass
 
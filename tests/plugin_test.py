@@ -27,3 +27,18 @@ def test_bad_driver():
 
     with pytest.raises(TypeError):
         BadDriver(None, None)
+
+
+def test_get_plugin_instance(config):
+    config.load_defaults()
+    cls = plugin.get_plugins('test_process')['test_process']
+    instance = plugin.get_plugin_instance('test_process', cls, config)
+    assert plugin.get_plugin_instance('test_process', cls, config) is instance
+    # Changes to unrelated sections don't matter
+    config['test_output']['string'] = 'quack'
+    assert plugin.get_plugin_instance('test_process', cls, config) is instance
+    config['test_process']['a_boolean'] = False
+    other = plugin.get_plugin_instance('test_process', cls, config)
+    assert other is not instance
+    assert not other.config['a_boolean'].get()
+    assert instance.config['a_boolean'].get()
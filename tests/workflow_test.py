@@ -1,10 +1,17 @@
 from __future__ import division, unicode_literals
 
+import json
+import os
+import time
+from datetime import datetime
+
+import mock
 import pytest
 from mock import Mock
 
 import spreads.util as util
 import spreads.workflow
+from spreads.vendor import bagit
 from conftest import TestDriver
 
 
@@ -113,3 +120,473 @@ def test_process(workflow):
 def test_output(workflow):
     workflow.output()
     # TODO: Verify
+
+
+def test_page_journal(workflow, config):
+    workflow.config['device']['parallel_capture'] = True
+    workflow.prepare_capture()
+    workflow.capture()
+    workflow.capture()
+    workflow.remove_pages(workflow.pages[0])
+    assert (workflow.path/'pagemeta.journal').exists()
+    assert not (workflow.path/'pagemeta.json').exists()
+
+    reloaded = spreads.workflow.Workflow(config=config, path=workflow.path)
+    assert ([p.capture_num for p in reloaded.pages] ==
+            [p.capture_num for p in workflow.pages])
+    assert ([p.sequence_num for p in reloaded.pages] ==
+            [p.sequence_num for p in workflow.pages])
+
+    workflow.finish_capture()
+    assert not (workflow.path/'pagemeta.journal').exists()
+    reloaded = spreads.workflow.Workflow(config=config, path=workflow.path)
+    assert len(reloaded.pages) == 3
+
+
+def test_page_lookup(workflow):
+    workflow.prepare_capture()
+    workflow.capture()
+    workflow.capture()
+    workflow.finish_capture()
+    first, second = workflow.pages[:2]
+    assert workflow.find_page_by_capture_num(first.capture_num) is first
+    assert workflow.find_page_by_sequence_num(1) is second
+    assert workflow.find_page_by_path(unicode(second.raw_image)) is second
+
+    workflow.remove_pages(first)
+    assert workflow.find_page_by_capture_num(first.capture_num) is None
+    assert workflow.find_page_by_path(first.raw_image) is None
+    assert workflow.find_page_by_sequence_num(0) is second
+
+    workflow.process()
+    proc_path = second.processed_images['test_process']
+    assert workflow.find_page_by_path(proc_path) is second
+
+
+def test_processing_lineage(workflow, config):
+    workflow.prepare_capture()
+    workflow.capture()
+    workflow.finish_capture()
+    workflow.process()
+    page = workflow.pages[0]
+    assert [s.plugin for s in page.lineage] == ['test_process',
+                                                'test_process2']
+    assert page.get_latest_processed(image_only=True) is None
+    assert (page.get_latest_processed(image_only=False)
+            == page.processed_images['test_process2'])
+
+    img_path = workflow.path/'data'/'done'/'000.jpg'
+    img_path.touch()
+    page.processed_images['test_process'] = img_path
+    assert [s.plugin for s in page.lineage] == ['test_process2',
+                                                'test_process']
+    assert page.get_latest_processed() == img_path
+    workflow.save()
+
+    reloaded = spreads.workflow.Workflow(config=config, path=workflow.path)
+    assert ([(s.plugin, s.path, s.is_image) for s in reloaded.pages[0].lineage]
+            == [(s.plugin, s.path, s.is_image) for s in page.lineage])
+
+
+def test_process_streaming(workflow):
+    import spreads.plugin as plugin
+
+    class StreamingPlugin(plugin.HookPlugin, plugin.ProcessHooksMixin):
+        def __init__(self, config, name):
+            self.__name__ = name
+            super(StreamingPlugin, self).__init__(config)
+
+        def process(self, pages, target_path):
+            raise AssertionError("Should not be called")
+
+        def process_page(self, page, target_path):
+            proc_path = target_path/"{0}_{1}.jpg".format(
+                page.capture_num, self.__name__)
+            proc_path.touch()
+            page.processed_images[self.__name__] = proc_path
+
+    class BarrierPlugin(plugin.HookPlugin, plugin.ProcessHooksMixin):
+        __name__ = 'barrier'
+
+        def process(self, pages, target_path):
+            # All pages have to be through the previous stages
+            assert all('first' in p.processed_images and
+                       'second' in p.processed_images for p in pages)
+            for page in pages:
+                page.processed_images[self.__name__] = (
+                    page.get_latest_processed())
+
+    workflow.config['device']['parallel_capture'] = True
+    workflow.prepare_capture()
+    for _ in xrange(5):
+        workflow.capture()
+    workflow.finish_capture()
+    workflow._plugin_instances = [
+        StreamingPlugin(workflow.config, 'first'),
+        StreamingPlugin(workflow.config, 'second'),
+        BarrierPlugin(workflow.config),
+        StreamingPlugin(workflow.config, 'third')]
+    workflow.process()
+    for page in workflow.pages:
+        assert ([s.plugin for s in page.lineage] ==
+                ['first', 'second', 'barrier', 'third'])
+    assert workflow.status['step_progress'] == 1
+
+
+def test_process_incremental(workflow):
+    workflow.config['device']['parallel_capture'] = True
+    workflow.prepare_capture()
+    workflow.capture()
+    workflow.finish_capture()
+    workflow.process()
+
+    def get_timestamps():
+        return [[s.timestamp for s in p.lineage] for p in workflow.pages]
+    timestamps = get_timestamps()
+    with mock.patch('spreads.vendor.bagit.hash_file',
+                    side_effect=bagit.hash_file) as hash_file:
+        workflow.process()
+        # Processed files that were not written again are not re-hashed
+        assert not any('done' in call[0][0].split(os.sep)
+                       for call in hash_file.call_args_list)
+    assert get_timestamps() == timestamps
+
+    # Changing the configuration of the second plugin only affects that one
+    workflow.config['test_process2']['an_integer'] = 1337
+    workflow.process()
+    for old, new in zip(timestamps, get_timestamps()):
+        assert old[0] == new[0]
+        assert old[1] != new[1]
+
+    # A new raw image means that all plugins have to process the page again
+    timestamps = get_timestamps()
+    page = workflow.pages[0]
+    with page.raw_image.open('ab') as fp:
+        fp.write(b'retake')
+    workflow.bag.add_payload(unicode(page.raw_image))
+    workflow.process()
+    assert all(x != y for x, y in zip(timestamps[0], get_timestamps()[0]))
+    assert get_timestamps()[1] == timestamps[1]
+
+    workflow.process(force=True)
+    assert all(x != y for x, y in zip(timestamps[1], get_timestamps()[1]))
+
+
+def test_process_resume(workflow, config, tmpdir):
+    from conftest import TestPluginProcessB
+    workflow.prepare_capture()
+    workflow.capture()
+    workflow.finish_capture()
+    with mock.patch.object(TestPluginProcessB, 'process',
+                           side_effect=IOError("interrupted")):
+        with pytest.raises(IOError):
+            workflow.process()
+    timestamps = [p.lineage[0].timestamp for p in workflow.pages]
+
+    # The work of the first plugin was checkpointed and is not repeated
+    resumed = spreads.workflow.Workflow(config=config, path=unicode(tmpdir))
+    assert [len(p.lineage) for p in resumed.pages] == [1, 1]
+    resumed.process()
+    assert [p.lineage[0].timestamp for p in resumed.pages] == timestamps
+    assert all(len(p.lineage) == 2 for p in resumed.pages)
+
+
+def test_output_incremental(workflow):
+    workflow.prepare_capture()
+    workflow.capture()
+    workflow.finish_capture()
+    workflow.output()
+    out_file = workflow.path/'data'/'out'/'output.txt'
+    manifest_path = workflow.path/'output-manifests'/'test_output.json'
+    assert manifest_path.exists()
+
+    def get_mtime():
+        return (out_file.stat().st_mtime, manifest_path.stat().st_mtime)
+    mtime = get_mtime()
+    time.sleep(0.01)
+    workflow.output()
+    assert get_mtime() == mtime
+
+    workflow.metadata = {'title': 'Changed'}
+    workflow.output()
+    assert get_mtime() != mtime
+    mtime = get_mtime()
+    time.sleep(0.01)
+
+    workflow.output(force=True)
+    assert get_mtime() != mtime
+
+
+def test_output_nested_files(workflow, monkeypatch):
+    from conftest import TestPluginOutput
+    nested = workflow.path/'data'/'out'/'html'/'index.html'
+    nested.parent.mkdir(parents=True)
+    with nested.open('wb') as fp:
+        fp.write(b'old')
+    time.sleep(0.01)
+
+    def output(self, pages, target_path, metadata, table_of_contents):
+        with (target_path/'html'/'index.html').open('wb') as fp:
+            fp.write(b'new content')
+    monkeypatch.setattr(TestPluginOutput, 'output', output)
+    workflow.output()
+    manifest_path = workflow.path/'output-manifests'/'test_output.json'
+    with manifest_path.open('r', encoding='utf-8') as fp:
+        files = json.load(fp)['files']
+    assert files.keys() == ['data/out/html/index.html']
+    assert unicode(nested) in workflow.bag.payload
+
+
+def test_crop_pages(workflow):
+    from PIL import Image
+    workflow.config['device']['parallel_capture'] = True
+    workflow.prepare_capture()
+    workflow.capture()
+    workflow.finish_capture()
+    pages = workflow.pages
+    checksums = [workflow._get_payload_checksum(p.raw_image) for p in pages]
+    progress = []
+    callback = lambda sender, **kwargs: progress.append(kwargs['progress'])
+    with spreads.workflow.on_crop_progressed.connected_to(callback):
+        workflow.crop_pages([(p, (10, 20, 100, None)) for p in pages])
+    assert sorted(progress) == [0.5, 1.0]
+    for page, checksum in zip(pages, checksums):
+        width, height = Image.open(unicode(page.raw_image)).size
+        assert width == 100
+        assert workflow._get_payload_checksum(page.raw_image) != checksum
+
+
+def test_remove_pages(workflow, config):
+    workflow.prepare_capture()
+    for _ in xrange(3):
+        workflow.capture()
+    workflow.finish_capture()
+    for page, label in zip(workflow.pages, ['i', 'ii', 'iii', '1', '2', '3']):
+        page.page_label = label
+    pages = workflow.pages
+    workflow.table_of_contents = [
+        spreads.workflow.TocEntry('Preface', pages[1], pages[2], []),
+        spreads.workflow.TocEntry('Chapter 1', pages[3], pages[5], [])]
+    workflow.save()
+    removed_paths = [pages[1].raw_image, pages[3].raw_image]
+
+    workflow.remove_pages(pages[1], pages[3])
+    assert [p.page_label for p in workflow.pages] == ['i', 'ii', '1', '2']
+    assert [p.sequence_num for p in workflow.pages] == [0, 1, 2, 3]
+    assert workflow.table_of_contents[0].start_page is workflow.pages[1]
+    assert workflow.table_of_contents[0].end_page is workflow.pages[1]
+    assert workflow.table_of_contents[1].start_page is workflow.pages[2]
+    assert workflow.table_of_contents[1].end_page is workflow.pages[3]
+    for path in removed_paths:
+        assert not path.exists()
+        assert unicode(path) not in workflow.bag.payload
+
+    def get_toc(workflow):
+        return [(e.title, e.start_page.sequence_num, e.end_page.sequence_num)
+                for e in workflow.table_of_contents]
+    reloaded = spreads.workflow.Workflow(config=config, path=workflow.path)
+    assert get_toc(reloaded) == [('Preface', 1, 1), ('Chapter 1', 2, 3)]
+
+    # Entries that don't touch the removed pages are renumbered, too
+    workflow.remove_pages(workflow.pages[0])
+    assert get_toc(workflow) == [('Preface', 0, 0), ('Chapter 1', 1, 2)]
+    reloaded = spreads.workflow.Workflow(config=config, path=workflow.path)
+    assert get_toc(reloaded) == get_toc(workflow)
+
+
+def test_changed_events(workflow):
+    events = []
+
+    def receiver(sender, **kwargs):
+        events.append(kwargs)
+    with spreads.workflow.on_changed.connected_to(receiver, sender=workflow):
+        workflow.prepare_capture()
+        for _ in xrange(2):
+            workflow.capture()
+        workflow.finish_capture()
+        first_page = workflow.pages[0]
+        workflow.remove_pages(first_page)
+    assert [e['version'] for e in events] == [1, 2, 3]
+    assert workflow.version == 3
+    assert all(len(e['pages_added']) == 2 for e in events[:2])
+    assert events[1]['pages_added'] == workflow.pages[1:3]
+    assert events[2]['pages_added'] == []
+    assert events[2]['pages_removed'] == [first_page.capture_num]
+    assert events[2]['pages_updated'] == workflow.pages
+    assert 'table_of_contents' not in events[2]
+    assert all(e['epoch'] == workflow.epoch and not e['resync']
+               for e in events)
+
+    # Too many changed pages are not sent, receivers re-read them instead
+    workflow.max_event_pages = 2
+    with spreads.workflow.on_changed.connected_to(receiver, sender=workflow):
+        workflow.process()
+    assert events[-1]['resync']
+    assert events[-1]['pages_updated'] == []
+
+    # Versions start over with a new instance, but in a new epoch
+    reloaded = spreads.workflow.Workflow.reload(workflow.path)
+    assert reloaded.version == 0
+    assert reloaded.epoch != workflow.epoch
+
+
+def test_apply_patch(config, tmpdir):
+    import shutil
+    client_location = tmpdir.mkdir('client')
+    server_location = tmpdir.mkdir('server')
+    workflow = spreads.workflow.Workflow.create(
+        location=unicode(client_location), metadata={'title': 'Foo'},
+        config=config)
+    workflow.prepare_capture()
+    for _ in xrange(2):
+        workflow.capture()
+    workflow.finish_capture()
+    server_path = unicode(server_location.join('foo'))
+    shutil.copytree(unicode(workflow.path), server_path)
+    server = spreads.workflow.Workflow.load(server_path)
+    assert len(server.pages) == 4
+    server.process()
+    server.output()
+    assert (server.path/'output-manifests').exists()
+    removed_processed = server.pages[0].processed_images.values()
+    # A change on the server that was only journaled
+    server._append_to_journal({'action': 'update',
+                               'page': server.pages[0].to_dict()})
+
+    removed_path = workflow.pages[0].raw_image
+    assert removed_path.name == '000.jpg'
+    workflow.remove_pages(workflow.pages[0])
+    # Done by the upload task, since the journal is not sent
+    workflow.compact()
+
+    def make_patch(name):
+        manifests, tagmanifests = (
+            {alg: dict(manifest) for alg, manifest in files.iteritems()}
+            for files in (workflow.bag.manifest_files,
+                          workflow.bag.tagmanifest_files))
+        changed = server.bag.diff(manifests, tagmanifests)
+        changed.extend(p.name for p in workflow.path.iterdir()
+                       if p.name.startswith(('manifest-', 'tagmanifest-')))
+        patch_dir = tmpdir.join(name)
+        for relpath in changed:
+            target = patch_dir.join(relpath)
+            target.dirpath().ensure(dir=True)
+            shutil.copy2(unicode(workflow.path/relpath), unicode(target))
+        return patch_dir
+
+    # Patches that don't match are not applied at all
+    patch_dir = make_patch('broken_patch')
+    patch_dir.join('pagemeta.json').write('[]')
+    with pytest.raises(bagit.ValidationError):
+        spreads.workflow.Workflow.apply_patch(server, unicode(patch_dir))
+    assert spreads.workflow.Workflow.get_cached(server_path) is server
+    assert server.path.exists()
+    assert (server.path/'pagemeta.journal').exists()
+    server.bag.validate()
+    assert sorted(os.listdir(unicode(server_location))) == ['foo']
+
+    patched = spreads.workflow.Workflow.apply_patch(
+        server, unicode(make_patch('patch')))
+    assert spreads.workflow.Workflow.get_cached(server_path) is patched
+    assert len(patched.pages) == 3
+    assert all(p.raw_image.name != removed_path.name and
+               p.raw_image.exists() for p in patched.pages)
+    assert not (patched.path/'data'/'raw'/removed_path.name).exists()
+    assert not (patched.path/'pagemeta.journal').exists()
+    assert sorted(os.listdir(unicode(server_location))) == ['foo']
+    patched.bag.validate()
+
+    # Processing results of the remaining pages are kept
+    assert all(p.processed_images for p in patched.pages)
+    assert not any(p.exists() for p in removed_processed)
+    assert all(p.exists() for p in patched.out_files)
+    assert (patched.path/'output-manifests').exists()
+    timestamps = [[s.timestamp for s in p.lineage] for p in patched.pages]
+    patched.process()
+    assert [[s.timestamp for s in p.lineage]
+            for p in patched.pages] == timestamps
+
+
+def test_find_all_summary(config, tmpdir):
+    location = tmpdir.join('workflows')
+    location.mkdir()
+    workflow = spreads.workflow.Workflow.create(
+        unicode(location), metadata={'title': 'A Test Workflow'},
+        config=config)
+    workflow.prepare_capture()
+    workflow.capture()
+    workflow.finish_capture()
+    workflow.prepare_capture()
+    workflow.capture()
+    spreads.workflow.Workflow._cache.clear()
+
+    summaries = spreads.workflow.Workflow.find_all(unicode(location),
+                                                   key='id', summary=True)
+    summary = summaries[workflow.id]
+    assert summary.title == 'A Test Workflow'
+    assert summary.slug == 'a-test-workflow'
+    assert summary.page_count == 4
+    assert summary.status['step'] is None
+    assert spreads.workflow.Workflow.get_cached(workflow.path) is None
+
+    loaded = spreads.workflow.Workflow.find_by_id(unicode(location),
+                                                  workflow.id)
+    assert loaded.path == workflow.path
+    assert len(loaded.pages) == 4
+    assert spreads.workflow.Workflow.get_cached(workflow.path) is loaded
+
+
+def test_sha256_only(config, tmpdir):
+    config['checksum_algorithms'] = ['sha256']
+    location = tmpdir.join('workflows')
+    location.mkdir()
+    workflow = spreads.workflow.Workflow.create(
+        unicode(location), metadata={'title': 'A Test Workflow'},
+        config=config)
+    workflow.prepare_capture()
+    workflow.capture()
+    workflow.finish_capture()
+    assert not (workflow.path/'manifest-md5.txt').exists()
+    assert workflow.last_modified == datetime.fromtimestamp(
+        (workflow.path/'tagmanifest-sha256.txt').stat().st_mtime)
+
+    summary = spreads.workflow.WorkflowSummary.from_path(workflow.path)
+    assert summary.last_modified == workflow.last_modified
+    assert summary.page_count == 2
+
+
+def test_cache_eviction(config, tmpdir):
+    cache = spreads.workflow.WorkflowCache(max_size=2)
+    workflows = [spreads.workflow.Workflow(config=config,
+                                           path=unicode(tmpdir.join(name)))
+                 for name in ('a', 'b', 'c')]
+    for wf in workflows:
+        wf._plugins
+        cache.add(wf)
+    assert len(cache) == 2
+    assert cache.get(workflows[0].path) is None
+    assert workflows[0]._plugin_instances is None
+    assert cache.get(workflows[2].path) is workflows[2]
+
+    # Busy workflows are not evicted
+    workflows[1].status['prepared'] = True
+    cache.add(workflows[0])
+    assert cache.get(workflows[1].path) is workflows[1]
+    assert cache.get(workflows[2].path) is None
+
+
+def test_cache_replacement(config, tmpdir):
+    spreads.workflow.Workflow._cache.clear()
+    workflow = spreads.workflow.Workflow.create(
+        location=unicode(tmpdir), metadata={'title': 'Foo'}, config=config)
+    workflow._plugins
+    assert spreads.workflow.Workflow.get_cached(workflow.path) is workflow
+
+    # Plain instantiation does not touch the cache
+    other = spreads.workflow.Workflow(config=config, path=workflow.path)
+    assert spreads.workflow.Workflow.get_cached(workflow.path) is workflow
+
+    reloaded = spreads.workflow.Workflow.reload(workflow.path)
+    assert reloaded is not other
+    assert spreads.workflow.Workflow.get_cached(workflow.path) is reloaded
+    assert workflow._plugin_instances is None